@@ -2,19 +2,123 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_cors import CORS
+from sqlalchemy import event
 import os
 
+from .database import RoutingSession
+
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     
     # Configuration
     app.config['SECRET_KEY'] = 'your-secret-key'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, 'recipes.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'DATABASE_URL', 'sqlite:///' + os.path.join(app.instance_path, 'recipes.db'))
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Apply pending migrations while building the app. A current schema
+    # costs one PRAGMA; set to 0 to leave it to `flask db migrate` run once
+    # per deploy, so starting workers never open the database.
+    app.config['DB_AUTO_MIGRATE'] = os.environ.get('DB_AUTO_MIGRATE', '1') == '1'
+    # PRAGMA profile from database.SQLITE_PROFILES, applied to every connection
+    app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'production')
+    # Pool sized for threaded servers; connections may move between threads
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30,
+        'pool_recycle': 3600,
+        'connect_args': {'check_same_thread': False}
+    }
+    # Where read-only views query: 'primary', 'readonly' (separate pool of
+    # read-only connections to the same file) or 'snapshot' (a copy made
+    # every DB_SNAPSHOT_INTERVAL seconds by the job queue)
+    app.config['DB_READ_ROUTING'] = os.environ.get('DB_READ_ROUTING', 'readonly')
+    app.config['DB_READ_POOL_SIZE'] = int(os.environ.get('DB_READ_POOL_SIZE', 10))
+    app.config['DB_SNAPSHOT_PATH'] = os.environ.get(
+        'DB_SNAPSHOT_PATH', os.path.join(app.instance_path, 'recipes.snapshot.db'))
+    app.config['DB_SNAPSHOT_INTERVAL'] = float(os.environ.get('DB_SNAPSHOT_INTERVAL', 30))
+    # max-age for cacheable GET responses; clients revalidate with ETags after it
+    app.config['HTTP_CACHE_MAX_AGE'] = int(os.environ.get('HTTP_CACHE_MAX_AGE', 0))
+    # Read-through cache for categories and recipe documents. A memory cache
+    # is per process; use the redis backend to share it between workers.
+    app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+    app.config['CACHE_MAXSIZE'] = int(os.environ.get('CACHE_MAXSIZE', 1024))
+    app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))
+    app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # Recipes per transaction for POST /recipes/bulk
+    app.config['BULK_BATCH_SIZE'] = int(os.environ.get('BULK_BATCH_SIZE', 500))
+    # Password hashing runs on a process pool of PASSWORD_HASH_WORKERS (0 runs
+    # it inline). Up to PASSWORD_HASH_QUEUE more requests may wait for a slot;
+    # beyond that they get a 503 after PASSWORD_HASH_TIMEOUT seconds.
+    # PASSWORD_HASH_METHOD is any werkzeug method string; existing hashes are
+    # rewritten with it on the next login. The default is werkzeug's own, so
+    # hashes made before it was configurable are kept as they are.
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 2))
+    # Users loaded for each request are cached; USER_CACHE_STAMP is touched
+    # to invalidate every worker's cache from outside the app. With
+    # SESSION_CLAIMS_FOR_READS, read-only requests trust the signed session
+    # claims and skip the database entirely.
+    app.config['SESSION_USER_CACHE_SIZE'] = int(os.environ.get('SESSION_USER_CACHE_SIZE', 4096))
+    app.config['SESSION_USER_CACHE_TTL'] = int(os.environ.get('SESSION_USER_CACHE_TTL', 300))
+    app.config['USER_CACHE_STAMP'] = os.path.join(app.instance_path, 'users.stamp')
+    app.config['SESSION_CLAIMS_FOR_READS'] = os.environ.get('SESSION_CLAIMS_FOR_READS', '0') == '1'
+    # Request metrics: Server-Timing headers are opt-in; requests over either
+    # budget are logged as warnings
+    app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', '0') == '1'
+    app.config['QUERY_BUDGET'] = int(os.environ.get('QUERY_BUDGET', 20))
+    app.config['LATENCY_BUDGET_MS'] = float(os.environ.get('LATENCY_BUDGET_MS', 500))
+    # gzip/brotli for JSON responses of at least COMPRESS_MIN_SIZE bytes
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    app.config['COMPRESS_GZIP_LEVEL'] = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    app.config['COMPRESS_BROTLI_LEVEL'] = int(os.environ.get('COMPRESS_BROTLI_LEVEL', 4))
+    # Use orjson for JSON responses when it is installed
+    app.config['JSON_FAST_ENCODER'] = os.environ.get('JSON_FAST_ENCODER', '1') == '1'
+    # Recipe images are stored by content hash under IMAGE_ROOT. Thumbnails
+    # are made on a process pool of IMAGE_WORKERS (0 makes them inline).
+    # USE_X_SENDFILE lets a fronting nginx or Apache send the files.
+    app.config['IMAGE_ROOT'] = os.environ.get('IMAGE_ROOT', os.path.join(app.instance_path, 'images'))
+    app.config['IMAGE_MAX_BYTES'] = int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+    app.config['IMAGE_THUMBNAIL_SIZES'] = [
+        int(size) for size in os.environ.get('IMAGE_THUMBNAIL_SIZES', '320,960').split(',') if size]
+    app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 1))
+    app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '0') == '1'
+    # Background jobs queued in the jobs table. Each web process runs
+    # JOB_WORKERS threads (0 leaves them to `flask jobs run`). Failed jobs are
+    # retried with exponential backoff and moved to dead_jobs after
+    # JOB_MAX_ATTEMPTS; a claimed job is retried if not finished in JOB_LEASE.
+    app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 1))
+    app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+    app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    app.config['JOB_BACKOFF_BASE'] = float(os.environ.get('JOB_BACKOFF_BASE', 2))
+    app.config['JOB_BACKOFF_MAX'] = float(os.environ.get('JOB_BACKOFF_MAX', 300))
+    app.config['JOB_LEASE'] = float(os.environ.get('JOB_LEASE', 300))
+    # Per-route rate limits as key=count/period pairs, keyed by client ip,
+    # submitted username or logged-in user. Limits are per process with
+    # the memory backend; use redis to share them. Behind a reverse proxy,
+    # wrap the app in ProxyFix so the client ip is the real one.
+    app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    app.config['RATE_LIMIT_REDIS_URL'] = os.environ.get('RATE_LIMIT_REDIS_URL', app.config['CACHE_REDIS_URL'])
+    app.config['RATE_LIMIT_MAX_KEYS'] = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+    app.config['RATE_LIMITS'] = {
+        'login': os.environ.get('RATE_LIMIT_LOGIN', 'ip=30/minute,username=10/minute'),
+        'signup': os.environ.get('RATE_LIMIT_SIGNUP', 'ip=10/hour'),
+        'bulk_import': os.environ.get('RATE_LIMIT_BULK_IMPORT', 'user=10/minute'),
+        'image_upload': os.environ.get('RATE_LIMIT_IMAGE_UPLOAD', 'user=30/minute')
+    }
+    # Seconds between each process's checks for changed similarity signatures
+    app.config['SIMILAR_SYNC_INTERVAL'] = float(os.environ.get('SIMILAR_SYNC_INTERVAL', 5))
+    if config:
+        app.config.update(config)
+    from .json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # CORS configuration
     CORS(app, supports_credentials=True, resources={
@@ -27,9 +131,10 @@ def create_app():
                 "http://localhost:5177",
                 "http://localhost:5178"
             ],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "Accept"],
-            "expose_headers": ["Content-Range", "X-Content-Range"],
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization", "Accept", "If-None-Match", "If-Modified-Since",
+                              "If-Match"],
+            "expose_headers": ["Content-Range", "X-Content-Range", "ETag", "Last-Modified", "Server-Timing"],
             "supports_credentials": True,
             "max_age": 120
         }
@@ -38,6 +143,15 @@ def create_app():
     # Initialize Flask extensions
     db.init_app(app)
     login_manager.init_app(app)
+    from .cache import init_cache
+    init_cache(app)
+    from .ratelimit import init_rate_limits
+    init_rate_limits(app)
+    from .metrics import init_metrics
+    with app.app_context():
+        init_metrics(app, db.engine)
+    from .compression import init_compression
+    init_compression(app)
     login_manager.login_view = 'auth.login'
     
     # Ensure the instance folder exists
@@ -46,19 +160,32 @@ def create_app():
     except OSError:
         pass
     
-    @login_manager.user_loader
-    def load_user(user_id):
-        from .models import User
-        return User.query.get(int(user_id))
+    from .session_users import init_user_loader
+    init_user_loader(app, login_manager)
+    from .jobs import init_jobs
+    init_jobs(app)
     
     # Register blueprints
     from .auth import auth as auth_blueprint
     from .recipes import recipes as recipes_blueprint
+    from .images import images as images_blueprint
     app.register_blueprint(auth_blueprint)
     app.register_blueprint(recipes_blueprint)
+    app.register_blueprint(images_blueprint)
+    from .cli import init_cli
+    init_cli(app)
     
-    # Create database tables
+    # Create or upgrade database tables
     with app.app_context():
-        db.create_all()
+        if db.engine.dialect.name == 'sqlite':
+            from .database import apply_pragmas
+            profile = app.config['SQLITE_PROFILE']
+            event.listen(db.engine, 'connect',
+                lambda dbapi_conn, record: apply_pragmas(dbapi_conn, profile))
+        if app.config['DB_AUTO_MIGRATE']:
+            from .migrations import migrate_engine
+            migrate_engine(db.engine)
+        from .routing import init_read_routing
+        init_read_routing(app, db.engine)
     
     return app
@@ -1,10 +1,20 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
 from .models import User, db
+from .passwords import HashingBusy
+from .ratelimit import rate_limited
+from .session_users import forget_claims, remember_claims
+from .serializers import serialize_user
 
 auth = Blueprint('auth', __name__)
 
+def _server_busy():
+    response = jsonify({'error': 'Server busy, please retry', 'success': False})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
 @auth.route('/')
 def index():
     if request.headers.get('Accept') == 'application/json':
@@ -12,6 +22,7 @@ def index():
     return render_template('index.html')
 
 @auth.route('/signup', methods=['GET', 'POST'])
+@rate_limited('signup')
 def signup():
     if request.method == 'GET':
         return render_template('signup.html')
@@ -61,12 +72,16 @@ def signup():
             flash('Registration successful! Please log in.')
             return redirect(url_for('auth.login'))
 
+    except HashingBusy:
+        db.session.rollback()
+        return _server_busy()
     except Exception as e:
         db.session.rollback()
         message = 'Registration failed. Please try again.'
         return jsonify({'error': message}) if request.is_json else render_template('signup.html', error=message)
 
 @auth.route('/login', methods=['GET', 'POST'])
+@rate_limited('login')
 def login():
     if request.method == 'GET':
         return render_template('login.html')
@@ -80,7 +95,7 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
 
-    print(f"Login attempt for username: {username}")  # Debug log
+    current_app.logger.debug('Login attempt for username: %s', username)
 
     if not username or not password:
         message = 'Please fill out all fields'
@@ -88,21 +103,20 @@ def login():
 
     try:
         user = User.query.filter_by(username=username).first()
-        print(f"User found in database: {user is not None}")  # Debug log
         
         if user and user.check_password(password):
+            # Upgrade hashes made with an older method or cost while we have the password
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
             login_user(user, remember=True)
-            print("Login successful")  # Debug log
+            remember_claims(user)
             
             if request.is_json:
                 response = jsonify({
                     'success': True,
                     'message': 'Login successful',
-                    'user': {
-                        'id': user.id,
-                        'username': user.username,
-                        'email': user.email
-                    }
+                    'user': serialize_user(user)
                 })
                 response.headers.add('Access-Control-Allow-Credentials', 'true')
                 response.headers.add('Access-Control-Allow-Origin', request.headers.get('Origin'))
@@ -111,11 +125,13 @@ def login():
             return redirect(url_for('auth.index'))
             
         message = 'Invalid username or password'
-        print(f"Login failed: {message}")  # Debug log
+        current_app.logger.debug('Login failed for username: %s', username)
         return jsonify({'error': message, 'success': False}), 401
 
+    except HashingBusy:
+        return _server_busy()
     except Exception as e:
-        print(f"Error during login: {str(e)}")  # Debug log
+        current_app.logger.exception('Error during login')
         message = 'Login failed. Please try again.'
         return jsonify({'error': message, 'success': False}), 500
 
@@ -125,11 +141,7 @@ def check_auth():
     if current_user.is_authenticated:
         return jsonify({
             'authenticated': True,
-            'user': {
-                'id': current_user.id,
-                'username': current_user.username,
-                'email': current_user.email
-            }
+            'user': serialize_user(current_user)
         })
     return jsonify({'authenticated': False}), 401
 
@@ -137,6 +149,7 @@ def check_auth():
 @login_required
 def logout():
     logout_user()
+    forget_claims()
     if request.headers.get('Accept') == 'application/json':
         return jsonify({'success': True})
     return redirect(url_for('auth.index'))
@@ -146,11 +159,18 @@ def logout():
 def get_user(user_id):
     """Get user information by ID"""
     try:
-        user = User.query.get_or_404(user_id)
+        # Select the columns so recipe_count is read fresh rather than from
+        # an instance cached in the session
+        user = db.session.execute(
+            db.select(User.id, User.username, User.email, User.recipe_count).where(User.id == user_id)
+        ).first()
+        if user is None:
+            return jsonify({'error': 'User not found'}), 404
         return jsonify({
             'id': user.id,
             'username': user.username,
-            'email': user.email if user.id == current_user.id else None
+            'email': user.email if user.id == current_user.id else None,
+            'recipe_count': user.recipe_count
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
@@ -0,0 +1,154 @@
+import json
+import logging
+from flask import current_app
+from sqlalchemy import insert
+from . import db
+from .models import Category, Recipe, RecipeIngredient, recipe_categories
+from .ingredients import ingredient_index_rows
+from .jobs import enqueue
+from .serializers import recipe_query, serialize_recipe
+
+REQUIRED_FIELDS = ('title', 'description', 'ingredients', 'instructions')
+
+logger = logging.getLogger(__name__)
+
+class InvalidLine(ValueError):
+    """A line that cannot be imported; `message` is safe to show the client"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+def _category_id(entry, category_ids, known_ids):
+    """Category id for an int id, a name, or a {'name': ...} object"""
+    if isinstance(entry, dict):
+        entry = entry.get('name')
+        if not isinstance(entry, str):
+            raise InvalidLine('Category objects need a string name')
+    if isinstance(entry, bool) or not isinstance(entry, (int, str)):
+        raise InvalidLine('Categories must be ids, names or {"name": ...} objects')
+    category_id = category_ids.get(entry) if isinstance(entry, str) else entry
+    if category_id not in known_ids:
+        raise InvalidLine(f'Unknown category: {entry}')
+    return category_id
+
+def _parse_line(line, category_ids, known_ids):
+    try:
+        data = json.loads(line)
+    except ValueError:
+        raise InvalidLine('Invalid JSON')
+    if not isinstance(data, dict):
+        raise InvalidLine('Each line must be a JSON object')
+    missing = [k for k in REQUIRED_FIELDS if not data.get(k)]
+    if missing:
+        raise InvalidLine('Missing required fields: ' + ', '.join(missing))
+    not_text = [k for k in REQUIRED_FIELDS if not isinstance(data[k], str)]
+    if not_text:
+        raise InvalidLine('Fields must be strings: ' + ', '.join(not_text))
+    categories = data.get('categories', [])
+    if not isinstance(categories, list):
+        raise InvalidLine('categories must be a list')
+    return data, sorted({_category_id(c, category_ids, known_ids) for c in categories})
+
+def _insert_rows(batch, user_id):
+    """Insert parsed recipes with one executemany per table; returns their ids"""
+    result = db.session.execute(
+        insert(Recipe).returning(Recipe.id, sort_by_parameter_order=True),
+        [{k: data[k] for k in REQUIRED_FIELDS} | {'user_id': user_id} for _, data, _ in batch]
+    )
+    recipe_ids = result.scalars().all()
+
+    category_rows = []
+    ingredient_rows = []
+    for recipe_id, (_, data, category_ids) in zip(recipe_ids, batch):
+        category_rows += [{'recipe_id': recipe_id, 'category_id': c} for c in category_ids]
+        ingredient_rows += ingredient_index_rows(recipe_id, data['ingredients'])
+    if category_rows:
+        db.session.execute(insert(recipe_categories), category_rows)
+    if ingredient_rows:
+        db.session.execute(insert(RecipeIngredient), ingredient_rows)
+    return recipe_ids
+
+def _insert_batch(batch, user_id):
+    """Insert one batch in a single transaction; returns the failed line numbers.
+
+    If the batch insert fails, it is retried one row at a time in
+    savepoints so only the rows that fail themselves are dropped.
+    """
+    failed = []
+    try:
+        recipe_ids = _insert_rows(batch, user_id)
+    except Exception:
+        db.session.rollback()
+        recipe_ids = []
+        for row in batch:
+            try:
+                with db.session.begin_nested():
+                    recipe_ids += _insert_rows([row], user_id)
+            except Exception:
+                logger.warning('bulk import: line %d failed to insert', row[0], exc_info=True)
+                failed.append(row[0])
+    if recipe_ids:
+        enqueue('index_similarity', {'recipe_ids': recipe_ids})
+    db.session.commit()
+    return failed
+
+def import_ndjson(lines, user_id, batch_size=500):
+    """Import recipes from an iterable of NDJSON lines.
+
+    Lines that fail validation or insertion are reported and skipped;
+    the rest are inserted in transactions of `batch_size` recipes.
+    Returns (inserted_count, errors) where errors are {'line', 'error'}
+    dicts.
+    """
+    category_ids = dict(db.session.query(Category.name, Category.id).all())
+    known_ids = set(category_ids.values())
+    inserted = 0
+    errors = []
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        try:
+            failed = _insert_batch(batch, user_id)
+        except Exception:
+            db.session.rollback()
+            logger.exception('bulk import: batch of %d lines failed', len(batch))
+            failed = [number for number, _, _ in batch]
+        inserted += len(batch) - len(failed)
+        errors.extend({'line': number, 'error': 'Could not insert recipe'} for number in failed)
+        batch.clear()
+
+    for number, line in enumerate(lines, start=1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            data, categories = _parse_line(line, category_ids, known_ids)
+        except UnicodeDecodeError:
+            errors.append({'line': number, 'error': 'Line is not valid UTF-8'})
+            continue
+        except InvalidLine as e:
+            errors.append({'line': number, 'error': e.message})
+            continue
+        batch.append((number, data, categories))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    errors.sort(key=lambda error: error['line'])
+    return inserted, errors
+
+def export_ndjson(user_id=None, chunk_size=1000):
+    """Yield every recipe as one NDJSON line, streaming rows in chunks.
+
+    yield_per keeps only one chunk of ORM objects alive at a time, and
+    categories are loaded per chunk.
+    """
+    encode = current_app.json.dump_bytes
+    query = recipe_query().order_by(Recipe.id)
+    if user_id:
+        query = query.filter(Recipe.user_id == user_id)
+    for recipe in query.yield_per(chunk_size):
+        yield encode(serialize_recipe(recipe)) + b'\n'
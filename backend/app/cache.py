@@ -0,0 +1,158 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL"""
+
+    # Each worker process has its own copy, so a delete only reaches the
+    # process that made the write; readers revalidate entries themselves
+    shared = False
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def add_encoding(self, key, entry, encoding, encoded):
+        """Keep an encoded copy of the body in an entry returned by get().
+
+        Entries are shared dicts, so the copy is added in place. An entry
+        already deleted or replaced by a write is not put back.
+        """
+        entry[encoding] = encoded
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+class RedisCache:
+    """Cache shared between worker processes, stored in Redis.
+
+    Any client with the redis-py get/set/delete API works, so a local
+    stand-in such as fakeredis can be passed as `client`.
+    """
+
+    shared = True
+
+    def __init__(self, url=None, client=None, ttl=300, prefix='myrecipe:'):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError('CACHE_BACKEND=redis requires the redis package')
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def add_encoding(self, key, entry, encoding, encoded):
+        """Add an encoded copy of the body to the stored entry, but only if
+        it is still the one `entry` was read from (same etag).
+
+        WATCH makes the check and the write one step, so an invalidation
+        in between is never undone, and KEEPTTL leaves its expiry alone.
+        """
+        from redis.exceptions import WatchError
+        full_key = self.prefix + key
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(full_key)
+                raw = pipe.get(full_key)
+                if raw is None:
+                    return
+                current = pickle.loads(raw)
+                if current.get('etag') != entry.get('etag'):
+                    return
+                current[encoding] = encoded
+                pipe.multi()
+                pipe.set(full_key, pickle.dumps(current), keepttl=True)
+                pipe.execute()
+            except WatchError:
+                # Written or deleted meanwhile; the next hit compresses again
+                pass
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        # Redis evicts on its own, so evictions are not visible from here
+        return {'backend': 'redis', 'hits': self.hits, 'misses': self.misses, 'evictions': None}
+
+def init_cache(app):
+    backend = app.config['CACHE_BACKEND']
+    if backend == 'memory':
+        cache = LRUCache(maxsize=app.config['CACHE_MAXSIZE'], ttl=app.config['CACHE_TTL'])
+    elif backend == 'redis':
+        cache = RedisCache(url=app.config['CACHE_REDIS_URL'], ttl=app.config['CACHE_TTL'])
+    else:
+        raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+    app.extensions['recipe_cache'] = cache
+    return cache
+
+def get_cache():
+    return current_app.extensions['recipe_cache']
+
+def recipe_key(recipe_id):
+    return f'recipe:{recipe_id}'
+
+CATEGORIES_KEY = 'categories'
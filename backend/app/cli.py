@@ -0,0 +1,149 @@
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, text
+from werkzeug.security import generate_password_hash
+from . import db
+from .images import prune_orphans
+from .ingredients import rebuild_ingredient_index
+from .jobs import JobWorkers, queue_stats, retry_dead, run_pending
+from .migrations import SCHEMA_VERSION, migrate_engine
+from .models import Category, Recipe, User
+from .search import rebuild_index
+from .session_users import touch_user_stamp
+from .similar import load_numpy, rebuild_similarity_index
+
+# Maintenance commands, run as `flask --app app <group> <command>` from
+# backend/. Every command runs in an app built by the same create_app()
+# as the web workers, so it uses the configured database and settings.
+
+CATEGORIES = [
+    {'name': 'Breakfast', 'description': 'Morning meals and brunch recipes'},
+    {'name': 'Lunch', 'description': 'Midday meals and light dishes'},
+    {'name': 'Dinner', 'description': 'Evening meals and main courses'},
+    {'name': 'Dessert', 'description': 'Sweet treats and desserts'},
+    {'name': 'Vegetarian', 'description': 'Meat-free recipes'},
+    {'name': 'Vegan', 'description': 'Plant-based recipes without animal products'},
+    {'name': 'Gluten-Free', 'description': 'Recipes without gluten'},
+    {'name': 'Quick & Easy', 'description': 'Recipes that take 30 minutes or less'},
+    {'name': 'Healthy', 'description': 'Nutritious and balanced meals'},
+    {'name': 'Snacks', 'description': 'Light bites and appetizers'}
+]
+
+db_cli = AppGroup('db', help='Schema, seed data and database checks.')
+index_cli = AppGroup('index', help='Rebuild derived indexes from the recipes table.')
+users_cli = AppGroup('users', help='User administration.')
+images_cli = AppGroup('images', help='Image storage maintenance.')
+jobs_cli = AppGroup('jobs', help='Background job queue.')
+
+@db_cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations."""
+    for version, name in migrate_engine(db.engine):
+        click.echo(f'Applied migration {version}: {name}')
+    click.echo(f'Database is at schema version {SCHEMA_VERSION}')
+
+@db_cli.command('check')
+def check_command():
+    """Show the schema version, row counts and users."""
+    version = db.session.execute(text('PRAGMA user_version')).scalar()
+    click.echo(f'Schema version {version} (latest {SCHEMA_VERSION})')
+    for model in (User, Recipe, Category):
+        count = db.session.query(func.count(model.id)).scalar()
+        click.echo(f'{model.__tablename__}: {count} rows')
+    click.echo('\nUsers in database:')
+    for user_id, username, email, password_hash in db.session.query(
+            User.id, User.username, User.email, User.password_hash).order_by(User.id):
+        # Only show the start of the hash
+        click.echo(f'ID: {user_id}, Username: {username}, Email: {email}, '
+                   f'Password hash: {(password_hash or "")[:20]}...')
+
+@db_cli.command('seed-categories')
+def seed_categories_command():
+    """Add the default categories that do not exist yet."""
+    existing = {name for (name,) in db.session.query(Category.name)}
+    added = [Category(**data) for data in CATEGORIES if data['name'] not in existing]
+    db.session.add_all(added)
+    db.session.commit()
+    click.echo(f'Added {len(added)} categories')
+
+@index_cli.command('search')
+def index_search_command():
+    """Rebuild the full-text search index."""
+    rebuild_index()
+    click.echo('Search index rebuilt')
+
+@index_cli.command('ingredients')
+def index_ingredients_command():
+    """Rebuild the normalized ingredient index."""
+    rebuild_ingredient_index()
+    click.echo('Ingredient index rebuilt')
+
+@index_cli.command('similarity')
+def index_similarity_command():
+    """Recompute every recipe's similarity signature."""
+    if load_numpy() is None:
+        raise click.ClickException('Similar recipes require numpy')
+    start = time.perf_counter()
+    rebuild_similarity_index()
+    click.echo(f'Similarity index rebuilt in {time.perf_counter() - start:.1f}s')
+
+@users_cli.command('reset-password')
+@click.argument('username')
+@click.password_option(help='New password; prompted for when omitted.')
+def reset_password_command(username, password):
+    """Set a new password for USERNAME."""
+    if len(password) < 6:
+        raise click.BadParameter('must be at least 6 characters', param_hint='password')
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'User not found: {username}')
+    # Hashed inline: a one-off command has no use for the hashing pool
+    user.password_hash = generate_password_hash(password, current_app.config['PASSWORD_HASH_METHOD'])
+    db.session.commit()
+    # Drop cached copies of the user in running workers
+    touch_user_stamp(current_app.config['USER_CACHE_STAMP'])
+    click.echo(f'Password reset for user: {username}')
+
+@images_cli.command('prune')
+@click.option('--grace', default=3600, show_default=True,
+              help='Keep unreferenced files younger than this many seconds.')
+def prune_images_command(grace):
+    """Delete stored image files no recipe refers to."""
+    removed = prune_orphans(current_app.config['IMAGE_ROOT'], grace_seconds=grace)
+    click.echo(f'Removed {removed} unreferenced image files')
+
+@jobs_cli.command('run')
+@click.option('--threads', default=4, show_default=True)
+def run_jobs_command(threads):
+    """Run background jobs until interrupted."""
+    workers = JobWorkers(current_app._get_current_object(), threads)
+    workers.start()
+    click.echo(f'Running jobs on {threads} threads, Ctrl-C to stop')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        workers.stop()
+
+@jobs_cli.command('drain')
+def drain_jobs_command():
+    """Run every job that is runnable now, then exit."""
+    click.echo(f'Ran {run_pending()} jobs')
+
+@jobs_cli.command('retry-dead')
+@click.option('--kind', help='Only requeue dead jobs of this kind.')
+def retry_dead_command(kind):
+    """Move dead jobs back onto the queue."""
+    click.echo(f'Requeued {retry_dead(kind)} dead jobs')
+
+@jobs_cli.command('stats')
+def job_stats_command():
+    """Show queue depth and the age of the oldest job."""
+    for name, value in queue_stats().items():
+        click.echo(f'{name}: {value:g}' if isinstance(value, float) else f'{name}: {value}')
+
+def init_cli(app):
+    for group in (db_cli, index_cli, users_cli, images_cli, jobs_cli):
+        app.cli.add_command(group)
@@ -0,0 +1,57 @@
+import gzip
+from flask import current_app, request
+from .cache import get_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json',)
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def _compress(body, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(body, quality=config['COMPRESS_BROTLI_LEVEL'])
+    return gzip.compress(body, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+def attach_cache_entry(response, key, entry):
+    """Let the compressor reuse and fill encoded copies kept in a cache entry"""
+    response.cache_entry = (key, entry)
+    return response
+
+def compress_response(response):
+    """Content-negotiated gzip/brotli for JSON bodies above the size threshold"""
+    config = current_app.config
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    cache_entry = getattr(response, 'cache_entry', None)
+    encoded = cache_entry[1].get(encoding) if cache_entry else None
+    if encoded is None:
+        encoded = _compress(body, encoding, config)
+        if cache_entry:
+            # Store the encoded bytes next to the cached body for later hits
+            key, entry = cache_entry
+            get_cache().add_encoding(key, entry, encoding, encoded)
+
+    response.set_data(encoded)
+    response.headers['Content-Encoding'] = encoding
+    # Each encoding is a different representation, so it gets its own ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -1,52 +1,52 @@
-import sqlite3
+import os
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
 
-def get_db_connection():
-    conn = sqlite3.connect('instance/recipes.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+# PRAGMAs applied to every new SQLite connection, by profile name
+SQLITE_PROFILES = {
+    # SQLite's own defaults: rollback journal, no busy timeout
+    'default': {},
+    # WAL lets readers run alongside a writer; busy_timeout makes writers
+    # wait for the lock instead of failing with "database is locked"
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY'
+    }
+}
 
-def init_db():
-    conn = get_db_connection()
-    conn.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        password_hash TEXT NOT NULL
-    )
-    ''')
+DEFAULT_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
 
-    conn.execute('''
-    CREATE TABLE IF NOT EXISTS categories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE NOT NULL,
-        description TEXT
-    )
-    ''')
+# Settings a read-only connection cannot or need not change
+WRITE_PRAGMAS = ('journal_mode', 'synchronous')
 
-    conn.execute('''
-    CREATE TABLE IF NOT EXISTS recipes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT NOT NULL,
-        ingredients TEXT NOT NULL,
-        instructions TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        user_id INTEGER NOT NULL,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )
-    ''')
+def apply_pragmas(conn, profile=DEFAULT_PROFILE, read_only=False):
+    """Run the PRAGMAs of `profile` on a DB-API connection"""
+    cursor = conn.cursor()
+    for name, value in SQLITE_PROFILES[profile].items():
+        if not (read_only and name in WRITE_PRAGMAS):
+            cursor.execute(f'PRAGMA {name}={value}')
+    if read_only:
+        cursor.execute('PRAGMA query_only=1')
+    cursor.close()
 
-    conn.execute('''
-    CREATE TABLE IF NOT EXISTS recipe_categories (
-        recipe_id INTEGER,
-        category_id INTEGER,
-        PRIMARY KEY (recipe_id, category_id),
-        FOREIGN KEY (recipe_id) REFERENCES recipes (id),
-        FOREIGN KEY (category_id) REFERENCES categories (id)
-    )
-    ''')
+class RoutingSession(Session):
+    """Session that reads from info['read_engine'] when a view sets one.
 
-    conn.commit()
-    conn.close() 
\ No newline at end of file
+    Flushes, INSERT/UPDATE/DELETE statements and everything after the
+    session has written go to the primary engine, so a session always
+    sees its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if isinstance(clause, UpdateBase):
+            # DML executed directly, outside a flush, is a write as well
+            self.info['wrote'] = True
+        read_engine = self.info.get('read_engine')
+        if (read_engine is not None and bind is None and not self._flushing
+                and not self.info.get('wrote')):
+            return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,62 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, make_response, request
+
+def make_etag(*parts):
+    """Strong ETag value built from the parts that identify a representation"""
+    raw = '|'.join('' if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+def version_etag(kind, key, version):
+    """ETag that names a row version, so a precondition can be checked in SQL"""
+    return f'{kind}-{key}-v{version}'
+
+def if_match_versions(kind, key):
+    """Row versions named by the request's If-Match header.
+
+    None when there is no precondition (no header, or `*`). Otherwise the
+    set of versions whose ETag the client sent, which is empty when none
+    of them is an ETag of this resource. Weak tags never match (RFC 9110).
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    prefix = f'{kind}-{key}-v'
+    versions = set()
+    for tag in request.if_match:
+        # Compressed responses carry the ETag with an encoding suffix
+        tag = tag.removesuffix('-gzip').removesuffix('-br')
+        if tag.startswith(prefix) and tag[len(prefix):].isdigit():
+            versions.add(int(tag[len(prefix):]))
+    return versions
+
+def _as_utc(value):
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+def is_not_modified(etag, last_modified=None):
+    """True if the request's validators show the client copy is current.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if request.if_none_match:
+        # Compressed responses carry the ETag with an encoding suffix
+        return any(request.if_none_match.contains(tag)
+                   for tag in (etag, etag + '-gzip', etag + '-br'))
+    if last_modified is not None and request.if_modified_since:
+        return _as_utc(last_modified) <= request.if_modified_since
+    return False
+
+def add_validators(response, etag, last_modified=None):
+    """Attach ETag, Last-Modified and Cache-Control to a read response"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['HTTP_CACHE_MAX_AGE']
+    response.cache_control.must_revalidate = True
+    return response
+
+def not_modified(etag, last_modified=None):
+    """Empty 304 response carrying the same validators"""
+    return add_validators(make_response('', 304), etag, last_modified)
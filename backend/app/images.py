@@ -0,0 +1,329 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import Blueprint, abort, current_app, jsonify, request, send_file
+from flask_login import current_user, login_required
+from .models import Recipe, RecipeImage, db
+from .ratelimit import rate_limited
+from .serializers import compile_serializer
+
+# Pillow is only needed where thumbnails are made, so it is imported there;
+# checking that it is installed does not import it
+HAS_PILLOW = importlib.util.find_spec('PIL') is not None
+
+images = Blueprint('images', __name__)
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Content-addressed files never change, so clients may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+class UnsupportedImage(ValueError):
+    """Raised when an upload is not a JPEG, PNG, GIF or WebP file"""
+
+class ImageTooLarge(ValueError):
+    """Raised when an upload exceeds IMAGE_MAX_BYTES"""
+
+_serialize_image = compile_serializer(RecipeImage)
+
+def serialize_image(image):
+    data = _serialize_image(image)
+    data['url'] = f'/images/{image.digest}'
+    data['thumbnails'] = {str(size): f'/images/{image.digest}?size={size}'
+                          for size in current_app.config['IMAGE_THUMBNAIL_SIZES']}
+    return data
+
+def sniff_content_type(header):
+    for signature, content_type in SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+def blob_path(root, digest):
+    return os.path.join(root, 'objects', digest[:2], digest[2:4], digest)
+
+def thumbnail_path(root, digest, size):
+    return os.path.join(root, 'thumbs', str(size), digest[:2], digest[2:4], digest)
+
+def store_stream(stream, root, max_bytes):
+    """Copy an upload into the store in chunks and return (digest, content_type, size).
+
+    The bytes are hashed while they are written to a temporary file, which
+    is then renamed to its sha256 path. An upload whose content is already
+    stored is discarded, so each distinct image exists on disk once.
+    """
+    tmp_dir = os.path.join(root, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImageTooLarge()
+                hasher.update(chunk)
+                f.write(chunk)
+        with open(tmp_path, 'rb') as f:
+            content_type = sniff_content_type(f.read(12))
+        if content_type is None:
+            raise UnsupportedImage()
+
+        digest = hasher.hexdigest()
+        path = blob_path(root, digest)
+        if os.path.exists(path):
+            # Refresh the mtime so prune_orphans() leaves it alone
+            os.utime(path)
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return digest, content_type, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def make_thumbnails(root, digest, sizes):
+    """Write a bounded-size copy of a stored image for each of `sizes`.
+
+    Runs on the thumbnail pool. Each variant is written to a temporary
+    file and renamed into place, so readers never see a partial file.
+    """
+    pending = [size for size in sizes if not os.path.exists(thumbnail_path(root, digest, size))]
+    if not pending:
+        return
+    from PIL import Image, ImageOps
+    with Image.open(blob_path(root, digest)) as original:
+        # Let the JPEG decoder downscale while decoding
+        original.draft('RGB', (max(pending), max(pending)))
+        img = ImageOps.exif_transpose(original)
+        for size in sorted(pending, reverse=True):
+            thumb = img.copy()
+            thumb.thumbnail((size, size))
+            if thumb.mode in ('RGBA', 'LA', 'P'):
+                fmt = 'PNG'
+            else:
+                fmt = 'JPEG'
+                thumb = thumb.convert('RGB')
+            path = thumbnail_path(root, digest, size)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                thumb.save(f, fmt, quality=85, optimize=True)
+            os.replace(tmp_path, path)
+
+_pool = None
+_pool_pid = None
+_pending = set()
+_pool_lock = threading.Lock()
+
+def _get_pool(workers):
+    """Thumbnail process pool for this worker process, recreated after a fork"""
+    global _pool, _pool_pid
+    if _pool_pid != os.getpid():
+        _pool = None
+        _pending.clear()
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_pid = os.getpid()
+    return _pool
+
+def _discard_pool(pool):
+    """Drop a broken pool so the next _get_pool() starts a new one. Its
+    workers have already been terminated by the pool itself."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+def _thumbnail_done(digest, pool, future):
+    with _pool_lock:
+        _pending.discard(digest)
+    error = future.exception()
+    if isinstance(error, BrokenProcessPool):
+        _discard_pool(pool)
+    if error is not None:
+        logger.warning('thumbnails for %s failed: %s', digest, error)
+
+def schedule_thumbnails(digest):
+    """Queue thumbnail generation without waiting for it.
+
+    A digest already queued in this process is not queued again. With
+    IMAGE_WORKERS=0 the thumbnails are made inline instead.
+    """
+    config = current_app.config
+    if not HAS_PILLOW or not config['IMAGE_THUMBNAIL_SIZES']:
+        return
+    args = (config['IMAGE_ROOT'], digest, config['IMAGE_THUMBNAIL_SIZES'])
+    if not config['IMAGE_WORKERS']:
+        make_thumbnails(*args)
+        return
+    with _pool_lock:
+        pool = _get_pool(config['IMAGE_WORKERS'])
+        if digest in _pending:
+            return
+        _pending.add(digest)
+    # A pool whose worker died (the OOM killer, say) refuses all further
+    # work; it is replaced and the submit retried once
+    for _ in range(2):
+        try:
+            future = pool.submit(make_thumbnails, *args)
+            break
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            with _pool_lock:
+                pool = _get_pool(config['IMAGE_WORKERS'])
+    else:
+        # Missing variants are queued again when they are requested
+        with _pool_lock:
+            _pending.discard(digest)
+        logger.warning('could not queue thumbnails for %s: pool is broken', digest)
+        return
+    future.add_done_callback(lambda f, pool=pool: _thumbnail_done(digest, pool, f))
+
+def prune_orphans(root, grace_seconds=3600):
+    """Delete stored files no recipe refers to and return how many were removed.
+
+    Files touched within `grace_seconds` are kept, so an upload whose row
+    has not been committed yet is not pruned from under it.
+    """
+    referenced = {digest for (digest,) in db.session.query(RecipeImage.digest).distinct()}
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for top in ('objects', 'thumbs', 'tmp'):
+        for dirpath, _, filenames in os.walk(os.path.join(root, top)):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name not in referenced and os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+    return removed
+
+@images.route('/recipes/<int:recipe_id>/images', methods=['GET'])
+def list_images(recipe_id):
+    recipe = Recipe.query.get_or_404(recipe_id)
+    return jsonify([serialize_image(image) for image in recipe.images])
+
+@images.route('/recipes/<int:recipe_id>/images', methods=['POST'])
+@login_required
+@rate_limited('image_upload')
+def upload_image(recipe_id):
+    """Attach an image to a recipe.
+
+    Accepts either a multipart form with an `image` file or the raw image
+    bytes as the request body.
+    """
+    recipe = Recipe.query.get_or_404(recipe_id)
+
+    if recipe.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    max_bytes = current_app.config['IMAGE_MAX_BYTES']
+    # Leave room for multipart framing; the stored bytes are checked exactly below
+    if request.content_length is not None and request.content_length > max_bytes + CHUNK_SIZE:
+        return jsonify({'error': f'Images are limited to {max_bytes} bytes'}), 413
+
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        if upload is None:
+            return jsonify({'error': 'Missing image file'}), 400
+        stream = upload.stream
+    else:
+        stream = request.stream
+
+    try:
+        digest, content_type, size = store_stream(stream, current_app.config['IMAGE_ROOT'], max_bytes)
+    except ImageTooLarge:
+        return jsonify({'error': f'Images are limited to {max_bytes} bytes'}), 413
+    except UnsupportedImage:
+        return jsonify({'error': 'Images must be JPEG, PNG, GIF or WebP'}), 415
+
+    try:
+        image = RecipeImage.query.filter_by(recipe_id=recipe.id, digest=digest).first()
+        if image is not None:
+            return jsonify(serialize_image(image))
+        image = RecipeImage(recipe_id=recipe.id, digest=digest,
+                            content_type=content_type, byte_size=size)
+        db.session.add(image)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    schedule_thumbnails(digest)
+    return jsonify(serialize_image(image)), 201
+
+@images.route('/recipes/<int:recipe_id>/images/<int:image_id>', methods=['DELETE'])
+@login_required
+def delete_image(recipe_id, image_id):
+    image = RecipeImage.query.filter_by(id=image_id, recipe_id=recipe_id).first_or_404()
+
+    if db.session.get(Recipe, recipe_id).user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    try:
+        # The file may be shared with other recipes; prune_orphans() removes it later
+        db.session.delete(image)
+        db.session.commit()
+        return jsonify({'message': 'Image deleted successfully'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@images.route('/images/<digest>', methods=['GET'])
+def get_image(digest):
+    """Serve a stored image or one of its thumbnails straight from disk.
+
+    No database query is made: the digest names the file. send_file hands
+    the open file to the server (sendfile or X-Sendfile where available)
+    and answers Range and conditional requests itself.
+    """
+    if len(digest) != 64 or not all(c in '0123456789abcdef' for c in digest):
+        abort(404)
+    root = current_app.config['IMAGE_ROOT']
+    path = blob_path(root, digest)
+    etag = digest
+    max_age = IMMUTABLE_MAX_AGE
+
+    size = request.args.get('size', type=int)
+    if size is not None:
+        if size not in current_app.config['IMAGE_THUMBNAIL_SIZES']:
+            return jsonify({'error': 'Unknown thumbnail size'}), 400
+        thumb = thumbnail_path(root, digest, size)
+        if os.path.exists(thumb):
+            path, etag = thumb, f'{digest}-{size}'
+        elif os.path.exists(path):
+            # Not generated yet: serve the original briefly and queue the variant
+            schedule_thumbnails(digest)
+            max_age = 60
+
+    if not os.path.exists(path):
+        abort(404)
+    with open(path, 'rb') as f:
+        content_type = sniff_content_type(f.read(12)) or 'application/octet-stream'
+
+    response = send_file(path, mimetype=content_type, conditional=True,
+                         etag=etag, max_age=max_age)
+    response.cache_control.public = True
+    if max_age == IMMUTABLE_MAX_AGE:
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,193 @@
+import heapq
+import re
+from collections import Counter, namedtuple
+from sqlalchemy import insert, select, text
+from . import db
+from .jobs import job
+from .models import Recipe, RecipeIngredient
+
+UNITS = {
+    'cup': 'cup', 'cups': 'cup', 'c': 'cup',
+    'tablespoon': 'tbsp', 'tablespoons': 'tbsp', 'tbsp': 'tbsp', 'tbs': 'tbsp',
+    'teaspoon': 'tsp', 'teaspoons': 'tsp', 'tsp': 'tsp',
+    'g': 'g', 'gram': 'g', 'grams': 'g',
+    'kg': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'ml': 'ml', 'milliliter': 'ml', 'milliliters': 'ml', 'millilitre': 'ml', 'millilitres': 'ml',
+    'l': 'l', 'liter': 'l', 'liters': 'l', 'litre': 'l', 'litres': 'l',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'pinch': 'pinch', 'pinches': 'pinch', 'dash': 'dash',
+    'clove': 'clove', 'cloves': 'clove', 'can': 'can', 'cans': 'can',
+    'slice': 'slice', 'slices': 'slice', 'piece': 'piece', 'pieces': 'piece',
+    'bunch': 'bunch', 'handful': 'handful', 'package': 'package', 'packages': 'package'
+}
+
+FRACTIONS = {'½': 0.5, '⅓': 1 / 3, '⅔': 2 / 3, '¼': 0.25, '¾': 0.75, '⅛': 0.125}
+
+# Words that describe an ingredient rather than name it
+DESCRIPTORS = {
+    'a', 'an', 'the', 'of', 'and', 'or', 'to', 'taste', 'fresh', 'freshly',
+    'chopped', 'diced', 'minced', 'sliced', 'grated', 'finely', 'roughly',
+    'large', 'medium', 'small', 'whole', 'optional', 'about', 'some'
+}
+
+IRREGULAR_PLURALS = {'leaves': 'leaf', 'halves': 'half', 'loaves': 'loaf', 'knives': 'knife'}
+
+QUANTITY_RE = re.compile(r'^(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)?\s*([½⅓⅔¼¾⅛])?\s*')
+WORD_RE = re.compile(r"[a-z][a-z'-]*")
+
+def _parse_quantity(whole, fraction):
+    quantity = None
+    if whole:
+        quantity = 0.0
+        for part in whole.split():
+            if '/' in part:
+                numerator, denominator = part.split('/')
+                quantity += int(numerator) / int(denominator) if int(denominator) else 0
+            else:
+                quantity += float(part)
+    if fraction:
+        quantity = (quantity or 0.0) + FRACTIONS[fraction]
+    return quantity
+
+def _singular(word):
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us')) and len(word) > 3:
+        return word[:-1]
+    return word
+
+def normalize_token(name):
+    """Normalize an ingredient name, e.g. 'Fresh Tomatoes' -> 'tomato'"""
+    name = re.sub(r'\(.*?\)', ' ', name.lower())
+    words = [w for w in WORD_RE.findall(name) if w not in DESCRIPTORS]
+    if not words:
+        return None
+    words[-1] = _singular(words[-1])
+    return ' '.join(words)[:100]
+
+def parse_ingredient(line):
+    """Parse one ingredient line into (token, quantity, unit)"""
+    line = line.strip().lstrip('-*•').strip()
+    match = QUANTITY_RE.match(line)
+    quantity = _parse_quantity(match.group(1), match.group(2))
+    rest = line[match.end():]
+
+    unit = None
+    first, _, remainder = rest.partition(' ')
+    if quantity is not None and first.lower().rstrip('.') in UNITS:
+        unit = UNITS[first.lower().rstrip('.')]
+        rest = remainder
+    # '1 onion, chopped' - anything after the first comma is preparation
+    token = normalize_token(rest.split(',')[0])
+    return token, quantity, unit
+
+def parse_ingredients(text_blob):
+    """Parse a free-text ingredient list into unique (token, quantity, unit) rows.
+
+    One ingredient per line; a single-line list is split on commas and
+    semicolons instead.
+    """
+    lines = [l for l in text_blob.splitlines() if l.strip()]
+    if len(lines) == 1:
+        lines = re.split(r'[,;]', lines[0])
+    parsed = {}
+    for line in lines:
+        token, quantity, unit = parse_ingredient(line)
+        if token and token not in parsed:
+            parsed[token] = (token, quantity, unit)
+    return list(parsed.values())
+
+def ingredient_index_rows(recipe_id, text_blob):
+    """recipe_ingredients rows for one recipe, as dicts for a bulk insert"""
+    parsed = parse_ingredients(text_blob or '')
+    return [
+        {'recipe_id': recipe_id, 'ingredient_token': token, 'quantity': quantity, 'unit': unit,
+         'recipe_total': len(parsed)}
+        for token, quantity, unit in parsed
+    ]
+
+def index_ingredients(recipe):
+    """Replace the recipe's ingredient index rows from recipe.ingredients"""
+    parsed = parse_ingredients(recipe.ingredients or '')
+    recipe.ingredient_index = [
+        RecipeIngredient(ingredient_token=token, quantity=quantity, unit=unit, recipe_total=len(parsed))
+        for token, quantity, unit in parsed
+    ]
+
+@job('index_ingredients')
+def index_ingredients_job(payload):
+    """Background reindex of one recipe, enqueued by create and update"""
+    recipe = db.session.get(Recipe, payload['recipe_id'])
+    if recipe is not None:
+        index_ingredients(recipe)
+
+def rebuild_ingredient_index(batch_size=500):
+    """Re-parse the ingredients of every recipe, one batch of recipes at a time"""
+    RecipeIngredient.query.delete()
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            select(Recipe.id, Recipe.ingredients)
+            .where(Recipe.id > last_id).order_by(Recipe.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        rows = [row for recipe_id, ingredients in batch
+                for row in ingredient_index_rows(recipe_id, ingredients)]
+        if rows:
+            db.session.execute(insert(RecipeIngredient), rows)
+        last_id = batch[-1].id
+    db.session.commit()
+
+PantryMatch = namedtuple('PantryMatch', 'recipe_id matched total')
+
+def match_pantry(pantry, limit=20):
+    """Rank recipes by how much of their ingredient list `pantry` covers.
+
+    Recipes are visited from the fewest ingredients up, one recipe_total
+    at a time, each read from ix_recipe_ingredients_token_total. A recipe
+    of n ingredients covers at most min(len(pantry), n) / n of itself, so
+    the search stops once no larger recipe could outrank the `limit` best
+    found so far, without reading the matches of the rest.
+    Returns PantryMatch rows, best coverage first.
+    """
+    tokens = sorted({t for t in (normalize_token(p) for p in pantry) if t})
+    if not tokens or limit < 1:
+        return []
+    params = {'t%d' % i: token for i, token in enumerate(tokens)}
+    # One index seek per token for the largest recipe it appears in
+    largest = db.session.execute(text('SELECT max({largest}, 0)'.format(largest=', '.join(
+        'coalesce((SELECT MAX(recipe_total) FROM recipe_ingredients WHERE ingredient_token = :t%d), 0)' % i
+        for i in range(len(tokens))))), params).scalar()
+    # All matches of one recipe size as a single comma-separated value:
+    # tens of thousands of one-column rows cost more to build in Python
+    # than the index reads behind them
+    matches_of_size = text('''
+        SELECT group_concat(recipe_id) FROM recipe_ingredients
+        WHERE ingredient_token IN ({placeholders}) AND recipe_total = :total
+    '''.format(placeholders=', '.join(':t%d' % i for i in range(len(tokens)))))
+
+    # Min-heap of the best (coverage, matched, recipe_id, total) so far, so
+    # best[0] is the one to beat; tuple order is the ranking order
+    best = []
+    for total in range(1, largest + 1):
+        if len(best) == limit and (min(len(tokens), total) / total, len(tokens)) < best[0][:2]:
+            break
+        matches = db.session.execute(matches_of_size, dict(params, total=total)).scalar()
+        counts = Counter(matches.split(',') if matches else ())
+        # Once there are `limit` results, skip recipes whose coverage is
+        # below the worst of them before building any entries
+        at_least = int(best[0][0] * total) if len(best) == limit else 1
+        for recipe_id, matched in [item for item in counts.items() if item[1] >= at_least]:
+            entry = (matched / total, matched, int(recipe_id), total)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+    return [PantryMatch(recipe_id, matched, total)
+            for _, matched, recipe_id, total in sorted(best, reverse=True)]
@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, func, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from . import db
+from .models import DeadJob, Job
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> handler(payload), filled in by @job
+HANDLERS = {}
+
+# Set after a commit that enqueued jobs, so idle workers in this process
+# pick them up without waiting for the next poll
+_wakeup = threading.Event()
+
+# Read-only check run before CLAIM, so an idle poll never takes the write lock
+RUNNABLE = text('SELECT 1 FROM jobs WHERE run_at <= :now LIMIT 1')
+
+# Claim the next runnable job. Pushing run_at forward is the lease, and
+# clearing key lets the same work be enqueued again while this runs.
+CLAIM = text('''
+    UPDATE jobs SET run_at = :lease_until, locked_by = :worker, key = NULL, attempts = attempts + 1
+    WHERE id = (SELECT id FROM jobs WHERE run_at <= :now ORDER BY run_at, id LIMIT 1)
+    RETURNING id, kind, payload, attempts
+''')
+COMPLETE = text('DELETE FROM jobs WHERE id = :id AND locked_by = :worker')
+RETRY = text('''
+    UPDATE jobs SET run_at = :run_at, locked_by = NULL, last_error = :error
+    WHERE id = :id AND locked_by = :worker
+''')
+BURY = text('''
+    INSERT INTO dead_jobs (kind, payload, attempts, last_error, created_at, failed_at)
+    SELECT kind, payload, attempts, :error, created_at, :now FROM jobs
+    WHERE id = :id AND locked_by = :worker
+''')
+
+def job(kind):
+    """Register a function as the handler for jobs of `kind`"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+def enqueue(kind, payload=None, key=None, delay=0):
+    """Add a job to the current transaction.
+
+    The job becomes visible to workers when the caller commits, and is
+    discarded if it rolls back. While a job with the same `key` is waiting
+    to run, enqueueing another one is a no-op.
+    """
+    now = time.time()
+    db.session.execute(insert(Job).values(
+        kind=kind, key=key, payload=json.dumps(payload), attempts=0,
+        run_at=now + delay, created_at=now
+    ).on_conflict_do_nothing(index_elements=['key']))
+    db.session.info['jobs_enqueued'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _wake_workers(session):
+    if session.info.pop('jobs_enqueued', False):
+        _wakeup.set()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_enqueued(session):
+    session.info.pop('jobs_enqueued', None)
+
+def _backoff(attempts, config):
+    delay = min(config['JOB_BACKOFF_BASE'] * 2 ** (attempts - 1), config['JOB_BACKOFF_MAX'])
+    return delay * random.uniform(0.5, 1.0)
+
+def run_one(worker):
+    """Claim and run one job. Returns False if none was runnable.
+
+    The handler's database writes and the job's removal commit together,
+    so a job that succeeded is never run again. A failed job is retried
+    with exponential backoff, and moved to dead_jobs after
+    JOB_MAX_ATTEMPTS attempts.
+    """
+    config = current_app.config
+    now = time.time()
+    try:
+        runnable = db.session.execute(RUNNABLE, {'now': now}).first()
+        # End the read transaction: in WAL mode it could not be upgraded to
+        # a write if another connection committed in the meantime
+        db.session.commit()
+        if runnable is None:
+            return False
+        row = db.session.execute(CLAIM, {
+            'now': now, 'lease_until': now + config['JOB_LEASE'], 'worker': worker
+        }).first()
+        db.session.commit()
+        if row is None:
+            return False
+        job_id, kind, payload, attempts = row
+        params = {'id': job_id, 'worker': worker}
+        try:
+            HANDLERS[kind](json.loads(payload))
+            db.session.execute(COMPLETE, params)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            error = f'{type(e).__name__}: {e}'
+            if attempts >= config['JOB_MAX_ATTEMPTS']:
+                logger.error('job %s (%s) failed %d times, giving up: %s', job_id, kind, attempts, error)
+                db.session.execute(BURY, dict(params, error=error, now=time.time()))
+                db.session.execute(COMPLETE, params)
+            else:
+                logger.warning('job %s (%s) failed, attempt %d: %s', job_id, kind, attempts, error)
+                db.session.execute(RETRY, dict(params, error=error,
+                                               run_at=time.time() + _backoff(attempts, config)))
+            db.session.commit()
+        return True
+    finally:
+        db.session.remove()
+
+def run_pending(worker='inline', limit=None):
+    """Run runnable jobs in this thread until none are left; returns the count"""
+    count = 0
+    while (limit is None or count < limit) and run_one(worker):
+        count += 1
+    return count
+
+def retry_dead(kind=None):
+    """Move dead jobs back onto the queue with a fresh attempt count"""
+    query = DeadJob.query
+    if kind is not None:
+        query = query.filter_by(kind=kind)
+    dead = query.all()
+    now = time.time()
+    for d in dead:
+        db.session.add(Job(kind=d.kind, payload=d.payload, attempts=0, run_at=now, created_at=d.created_at))
+        db.session.delete(d)
+    db.session.commit()
+    return len(dead)
+
+def queue_stats():
+    now = time.time()
+    return {
+        'queued': Job.query.count(),
+        'runnable': Job.query.filter(Job.run_at <= now).count(),
+        'dead': DeadJob.query.count(),
+        'oldest_age_seconds': now - (db.session.query(func.min(Job.created_at)).scalar() or now)
+    }
+
+class JobWorkers:
+    """A pool of daemon threads that run jobs for one app in one process"""
+
+    def __init__(self, app, threads):
+        self.app = app
+        self.threads = threads
+        self.pid = None
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the threads unless this process already has them"""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            for i in range(self.threads):
+                name = f'{os.uname().nodename}:{self.pid}:{i}'
+                threading.Thread(target=self._run, args=(name,), name=f'jobs-{i}', daemon=True).start()
+
+    def stop(self):
+        self.stopping.set()
+        _wakeup.set()
+
+    def _run(self, name):
+        poll_interval = self.app.config['JOB_POLL_INTERVAL']
+        with self.app.app_context():
+            while not self.stopping.is_set():
+                try:
+                    if run_one(name):
+                        continue
+                except Exception:
+                    logger.exception('job worker %s failed to claim a job', name)
+                _wakeup.wait(poll_interval)
+                _wakeup.clear()
+
+def init_jobs(app):
+    """Run jobs on JOB_WORKERS threads in each web process, started by its
+    first request so forked server workers each get their own"""
+    workers = JobWorkers(app, app.config['JOB_WORKERS'])
+    app.extensions['job_workers'] = workers
+    if app.config['JOB_WORKERS']:
+        app.before_request(workers.start)
@@ -0,0 +1,68 @@
+import dataclasses
+import decimal
+import json
+import time
+import uuid
+from datetime import date, datetime, timezone
+from flask.json.provider import JSONProvider
+from .metrics import record_json_time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    """Encode the types the stdlib encoder cannot; naive datetimes are UTC"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider that uses orjson when it is installed.
+
+    Both paths write datetimes as ISO-8601 with an explicit UTC offset and
+    keep dict keys in insertion order. Set JSON_FAST_ENCODER = False to
+    force the stdlib encoder.
+    """
+
+    mimetype = 'application/json'
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and app.config.get('JSON_FAST_ENCODER', True)
+
+    def dump_bytes(self, obj):
+        start = time.perf_counter()
+        if self.use_orjson:
+            body = orjson.dumps(obj, default=_default, option=orjson.OPT_NAIVE_UTC)
+        else:
+            body = json.dumps(obj, default=_default, ensure_ascii=False,
+                              separators=(',', ':')).encode('utf-8')
+        record_json_time(time.perf_counter() - start)
+        return body
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return self.dump_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dump_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from flask import Blueprint, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from .jobs import queue_stats
+
+metrics = Blueprint('metrics', __name__)
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+class Registry:
+    """Per-process request metrics, keyed by endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.requests = defaultdict(int)
+        self.db_time = defaultdict(float)
+        self.json_time = defaultdict(float)
+
+    def record(self, endpoint, method, status, latency, statements, db_time, json_time):
+        with self.lock:
+            self.latency[endpoint].observe(latency)
+            self.queries[endpoint].observe(statements)
+            self.requests[(endpoint, method, status)] += 1
+            self.db_time[endpoint] += db_time
+            self.json_time[endpoint] += json_time
+
+    def render(self, extra=()):
+        lines = []
+        with self.lock:
+            lines += ['# TYPE http_requests_total counter']
+            for (endpoint, method, status), value in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {value}')
+            for name, histograms in (('http_request_duration_seconds', self.latency),
+                                     ('db_statements_per_request', self.queries)):
+                lines.append(f'# TYPE {name} histogram')
+                for endpoint, h in sorted(histograms.items()):
+                    for bound, value in zip(h.buckets, h.counts):
+                        lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {value}')
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {h.count}')
+                    lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {h.sum}')
+                    lines.append(f'{name}_count{{endpoint="{endpoint}"}} {h.count}')
+            for name, totals in (('db_time_seconds_total', self.db_time),
+                                 ('json_serialization_seconds_total', self.json_time)):
+                lines.append(f'# TYPE {name} counter')
+                for endpoint, value in sorted(totals.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+        lines += extra
+        return '\n'.join(lines) + '\n'
+
+def record_json_time(seconds):
+    """Add serialization time to the current request's totals"""
+    if has_request_context() and 'metrics_start' in g:
+        g.json_time += seconds
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if has_request_context() and 'metrics_start' in g:
+        g.sql_count += 1
+        g.sql_time += elapsed
+
+def _handle_error(context):
+    # after_cursor_execute does not run for failed statements
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+    g.json_time = 0.0
+
+def _record(response):
+    if 'metrics_start' not in g:
+        return response
+    config = current_app.config
+    latency = time.perf_counter() - g.metrics_start
+    endpoint = request.endpoint or 'unmatched'
+    current_app.extensions['metrics'].record(
+        endpoint, request.method, response.status_code, latency, g.sql_count, g.sql_time, g.json_time)
+
+    if config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = (
+            f'db;desc="{g.sql_count} statements";dur={g.sql_time * 1000:.2f}, '
+            f'json;dur={g.json_time * 1000:.2f}, '
+            f'total;dur={latency * 1000:.2f}'
+        )
+    if g.sql_count > config['QUERY_BUDGET'] or latency * 1000 > config['LATENCY_BUDGET_MS']:
+        logger.warning('%s %s over budget: %.1f ms, %d statements (%.1f ms in the database)',
+                       request.method, request.path, latency * 1000, g.sql_count, g.sql_time * 1000)
+    return response
+
+@metrics.route('/metrics', methods=['GET'])
+def export_metrics():
+    extra = []
+    cache_stats = current_app.extensions['recipe_cache'].stats()
+    for key in ('hits', 'misses', 'evictions'):
+        if cache_stats.get(key) is not None:
+            extra.append(f'# TYPE recipe_cache_{key}_total counter')
+            extra.append(f'recipe_cache_{key}_total {cache_stats[key]}')
+    for key, value in queue_stats().items():
+        extra.append(f'# TYPE jobs_{key} gauge')
+        extra.append(f'jobs_{key} {value}')
+    body = current_app.extensions['metrics'].render(extra)
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+def instrument_engine(engine):
+    """Count and time the statements `engine` runs in each request"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+def init_metrics(app, engine):
+    """Register the timers. Call before other after_request hooks are added
+    so the recorded latency includes them."""
+    app.extensions['metrics'] = Registry()
+    app.before_request(_start_timer)
+    app.after_request(_record)
+    instrument_engine(engine)
+    app.register_blueprint(metrics)
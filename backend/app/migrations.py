@@ -0,0 +1,260 @@
+from .search import FTS_SCHEMA
+
+def add_column(table, column, definition):
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists"""
+    def apply(conn):
+        if column not in {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return apply
+
+# Ordered schema migrations as (version, name, statements). The applied
+# version is kept in SQLite's PRAGMA user_version. A statement is SQL or a
+# function of the connection, like add_column(). Every statement is written
+# to be idempotent so databases created before the runner existed (by
+# db.create_all() or the old init_db.py) can be brought up to date safely.
+MIGRATIONS = [
+    (1, 'base schema', [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(80) UNIQUE NOT NULL,
+            email VARCHAR(120) UNIQUE NOT NULL,
+            password_hash VARCHAR(128)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(50) UNIQUE NOT NULL,
+            description TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS recipes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title VARCHAR(100) NOT NULL,
+            description TEXT NOT NULL,
+            ingredients TEXT NOT NULL,
+            instructions TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_id INTEGER NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS recipe_categories (
+            recipe_id INTEGER,
+            category_id INTEGER,
+            PRIMARY KEY (recipe_id, category_id),
+            FOREIGN KEY (recipe_id) REFERENCES recipes (id),
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+        '''
+    ]),
+    (2, 'full-text search', FTS_SCHEMA + [
+        "INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')"
+    ]),
+    (3, 'ingredient index', [
+        '''
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            recipe_id INTEGER NOT NULL,
+            ingredient_token VARCHAR(100) NOT NULL,
+            quantity FLOAT,
+            unit VARCHAR(20),
+            PRIMARY KEY (recipe_id, ingredient_token),
+            FOREIGN KEY (recipe_id) REFERENCES recipes (id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_recipe_ingredients_token
+        ON recipe_ingredients (ingredient_token, recipe_id)
+        '''
+    ]),
+    (4, 'secondary indexes', [
+        'CREATE INDEX IF NOT EXISTS ix_recipes_user_id ON recipes (user_id, created_at, id)',
+        'CREATE INDEX IF NOT EXISTS ix_recipes_created_at ON recipes (created_at, id)',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_recipe_categories_category_id
+        ON recipe_categories (category_id, recipe_id)
+        ''',
+        'ANALYZE'
+    ]),
+    (5, 'category counts', [
+        '''
+        CREATE TABLE IF NOT EXISTS category_counts (
+            category_id INTEGER PRIMARY KEY,
+            recipe_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS category_counts_ai AFTER INSERT ON recipe_categories BEGIN
+            INSERT INTO category_counts (category_id, recipe_count) VALUES (new.category_id, 1)
+            ON CONFLICT (category_id) DO UPDATE SET recipe_count = recipe_count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS category_counts_ad AFTER DELETE ON recipe_categories BEGIN
+            UPDATE category_counts SET recipe_count = recipe_count - 1
+            WHERE category_id = old.category_id;
+        END
+        ''',
+        'DELETE FROM category_counts',
+        '''
+        INSERT INTO category_counts (category_id, recipe_count)
+        SELECT category_id, COUNT(*) FROM recipe_categories GROUP BY category_id
+        '''
+    ]),
+    (6, 'recipe images', [
+        '''
+        CREATE TABLE IF NOT EXISTS recipe_images (
+            id INTEGER NOT NULL PRIMARY KEY,
+            recipe_id INTEGER NOT NULL,
+            digest VARCHAR(64) NOT NULL,
+            content_type VARCHAR(50) NOT NULL,
+            byte_size INTEGER NOT NULL,
+            created_at DATETIME,
+            UNIQUE (recipe_id, digest),
+            FOREIGN KEY (recipe_id) REFERENCES recipes (id) ON DELETE CASCADE
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS ix_recipe_images_digest ON recipe_images (digest)'
+    ]),
+    (7, 'job queue', [
+        '''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER NOT NULL PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            key VARCHAR(200) UNIQUE,
+            payload TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_at FLOAT NOT NULL,
+            locked_by VARCHAR(100),
+            last_error TEXT,
+            created_at FLOAT NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS ix_jobs_run_at ON jobs (run_at, id)',
+        '''
+        CREATE TABLE IF NOT EXISTS dead_jobs (
+            id INTEGER NOT NULL PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            payload TEXT NOT NULL,
+            attempts INTEGER NOT NULL,
+            last_error TEXT,
+            created_at FLOAT NOT NULL,
+            failed_at FLOAT NOT NULL
+        )
+        '''
+    ]),
+    (8, 'user recipe counts', [
+        add_column('users', 'recipe_count', 'INTEGER NOT NULL DEFAULT 0'),
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_recipe_count_ai AFTER INSERT ON recipes BEGIN
+            UPDATE users SET recipe_count = recipe_count + 1 WHERE id = new.user_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_recipe_count_ad AFTER DELETE ON recipes BEGIN
+            UPDATE users SET recipe_count = recipe_count - 1 WHERE id = old.user_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_recipe_count_au AFTER UPDATE OF user_id ON recipes
+        WHEN old.user_id != new.user_id BEGIN
+            UPDATE users SET recipe_count = recipe_count - 1 WHERE id = old.user_id;
+            UPDATE users SET recipe_count = recipe_count + 1 WHERE id = new.user_id;
+        END
+        ''',
+        '''
+        UPDATE users SET recipe_count = (
+            SELECT COUNT(*) FROM recipes WHERE recipes.user_id = users.id)
+        '''
+    ]),
+    (9, 'similarity signatures', [
+        '''
+        CREATE TABLE IF NOT EXISTS recipe_signatures (
+            recipe_id INTEGER NOT NULL PRIMARY KEY,
+            signature BLOB,
+            version INTEGER NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS ix_recipe_signatures_version ON recipe_signatures (version)',
+        # Deleted recipes leave a NULL signature so every process's index drops them
+        '''
+        CREATE TRIGGER IF NOT EXISTS recipe_signatures_ad AFTER DELETE ON recipes BEGIN
+            UPDATE recipe_signatures
+            SET signature = NULL,
+                version = (SELECT MAX(version) FROM recipe_signatures) + 1
+            WHERE recipe_id = old.id;
+        END
+        ''',
+        # Signatures are computed in Python, so the backfill runs on the job queue
+        '''
+        INSERT OR IGNORE INTO jobs (kind, key, payload, attempts, run_at, created_at)
+        VALUES ('rebuild_similarity', 'rebuild_similarity', 'null', 0, 0, strftime('%s', 'now'))
+        '''
+    ]),
+    (10, 'recipe versions', [
+        add_column('recipes', 'version', 'INTEGER NOT NULL DEFAULT 1')
+    ]),
+    (11, 'recipe ingredient totals', [
+        # Each row carries its recipe's ingredient count, so pantry matches
+        # can be read from the index one recipe size at a time
+        add_column('recipe_ingredients', 'recipe_total', 'INTEGER NOT NULL DEFAULT 0'),
+        '''
+        UPDATE recipe_ingredients SET recipe_total = (
+            SELECT COUNT(*) FROM recipe_ingredients ri
+            WHERE ri.recipe_id = recipe_ingredients.recipe_id)
+        ''',
+        'DROP INDEX IF EXISTS ix_recipe_ingredients_token',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_recipe_ingredients_token_total
+        ON recipe_ingredients (ingredient_token, recipe_total, recipe_id)
+        '''
+    ])
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn):
+    """Apply pending migrations to a sqlite3 connection.
+
+    Each migration runs in its own BEGIN IMMEDIATE transaction, and the
+    version is re-read once the write lock is held, so several workers
+    starting at once apply every migration exactly once. Returns the list
+    of versions applied.
+    """
+    applied = []
+    # Common case for every worker start: one PRAGMA and no lock
+    if get_version(conn) >= SCHEMA_VERSION:
+        return applied
+    for version, name, statements in MIGRATIONS:
+        if version <= get_version(conn):
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if version <= get_version(conn):
+                conn.rollback()
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append((version, name))
+    return applied
+
+def migrate_engine(engine):
+    """Run migrate() on a raw connection checked out from a SQLAlchemy engine"""
+    with engine.connect() as conn:
+        return migrate(conn.connection.driver_connection)
@@ -1,8 +1,8 @@
 # app/models.py
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from datetime import datetime
 from . import db
+from .passwords import hash_password, needs_rehash, verify_password
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -10,13 +10,18 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128))
+    # Kept current by triggers on recipes (migration 8)
+    recipe_count = db.Column(db.Integer, nullable=False, default=0)
     recipes = db.relationship('Recipe', backref='author', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
     @classmethod
     def get_by_username(cls, username):
@@ -24,7 +29,8 @@ class User(db.Model, UserMixin):
 
 recipe_categories = db.Table('recipe_categories',
     db.Column('recipe_id', db.Integer, db.ForeignKey('recipes.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True),
+    db.Index('ix_recipe_categories_category_id', 'category_id', 'recipe_id')
 )
 
 class Recipe(db.Model):
@@ -37,11 +43,102 @@ class Recipe(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    categories = db.relationship('Category', secondary=recipe_categories, lazy='subquery',
+    # Bumped by every write; ETags carry it so If-Match is checked by the UPDATE
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    categories = db.relationship('Category', secondary=recipe_categories, lazy='selectin',
         backref=db.backref('recipes', lazy=True))
+    ingredient_index = db.relationship('RecipeIngredient', lazy=True,
+        cascade='all, delete-orphan')
+    images = db.relationship('RecipeImage', lazy=True, order_by='RecipeImage.id',
+        cascade='all, delete-orphan')
+    __table_args__ = (
+        db.Index('ix_recipes_user_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_recipes_created_at', 'created_at', 'id'),
+    )
+    # Flushed updates and deletes also check the version they loaded
+    __mapper_args__ = {'version_id_col': version}
+
+class RecipeIngredient(db.Model):
+    """One parsed ingredient of a recipe, used for pantry lookups"""
+    __tablename__ = 'recipe_ingredients'
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id', ondelete='CASCADE'), primary_key=True)
+    ingredient_token = db.Column(db.String(100), primary_key=True)
+    quantity = db.Column(db.Float)
+    unit = db.Column(db.String(20))
+    # Number of ingredients in the whole recipe, written with every row
+    recipe_total = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.Index('ix_recipe_ingredients_token_total', 'ingredient_token', 'recipe_total', 'recipe_id'),
+    )
+
+class RecipeImage(db.Model):
+    """An image attached to a recipe; the file itself lives in the image store"""
+    __tablename__ = 'recipe_images'
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id', ondelete='CASCADE'), nullable=False)
+    digest = db.Column(db.String(64), nullable=False)
+    content_type = db.Column(db.String(50), nullable=False)
+    byte_size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.UniqueConstraint('recipe_id', 'digest'),
+        db.Index('ix_recipe_images_digest', 'digest'),
+    )
+
+class RecipeSignature(db.Model):
+    """MinHash signature of a recipe for similarity lookups; see similar.py.
+
+    version increases with every change so each process can pick up what
+    changed since it last looked. A NULL signature marks a recipe that was
+    deleted or has no usable text.
+    """
+    __tablename__ = 'recipe_signatures'
+    recipe_id = db.Column(db.Integer, primary_key=True)
+    signature = db.Column(db.LargeBinary)
+    version = db.Column(db.Integer, nullable=False)
+    __table_args__ = (
+        db.Index('ix_recipe_signatures_version', 'version'),
+    )
 
 class Category(db.Model):
     __tablename__ = 'categories'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     description = db.Column(db.Text)
+
+class CategoryCount(db.Model):
+    """Recipes per category, kept current by triggers on recipe_categories"""
+    __tablename__ = 'category_counts'
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    recipe_count = db.Column(db.Integer, nullable=False, default=0)
+
+class Job(db.Model):
+    """A pending background job; see jobs.py.
+
+    Times are unix timestamps. run_at doubles as the lease: claiming a job
+    pushes it forward, so a job whose worker died becomes runnable again.
+    """
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(200), unique=True)
+    payload = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_at = db.Column(db.Float, nullable=False)
+    locked_by = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.Float, nullable=False)
+    __table_args__ = (
+        db.Index('ix_jobs_run_at', 'run_at', 'id'),
+    )
+
+class DeadJob(db.Model):
+    """A job that failed JOB_MAX_ATTEMPTS times"""
+    __tablename__ = 'dead_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.Float, nullable=False)
+    failed_at = db.Column(db.Float, nullable=False)
@@ -0,0 +1,79 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated and the caller should back off"""
+
+_pool = None
+_pool_pid = None
+_slots = None
+_pool_lock = threading.Lock()
+
+def _get_pool(workers, queue_size):
+    """Process pool shared by this worker process, recreated after a fork"""
+    global _pool, _pool_pid, _slots
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            _pool = None
+            # Requests allowed to wait for or run on the pool at once
+            _slots = threading.BoundedSemaphore(workers + queue_size)
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_pid = os.getpid()
+        return _pool, _slots
+
+def _discard_pool(pool):
+    """Drop a broken pool so the next _get_pool() starts a new one. Its
+    workers have already been terminated by the pool itself."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+def _call(pool, func, *args):
+    try:
+        return pool.submit(func, *args).result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+
+def _run(func, *args):
+    config = current_app.config
+    workers = config['PASSWORD_HASH_WORKERS']
+    if not workers:
+        return func(*args)
+    pool, slots = _get_pool(workers, config['PASSWORD_HASH_QUEUE'])
+    if not slots.acquire(timeout=config['PASSWORD_HASH_TIMEOUT']):
+        raise HashingBusy()
+    try:
+        try:
+            return _call(pool, func, *args)
+        except BrokenProcessPool:
+            # A pool worker died (the OOM killer, say) and the pool refuses
+            # all further work; retry once on a new one
+            pool, _ = _get_pool(workers, config['PASSWORD_HASH_QUEUE'])
+            return _call(pool, func, *args)
+    finally:
+        slots.release()
+
+def hash_password(password):
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    """The method part werkzeug actually writes for `method`, with its
+    defaults filled in ('scrypt' is stored as 'scrypt:32768:8:1')"""
+    return generate_password_hash('', method).split('$', 1)[0]
+
+def needs_rehash(password_hash):
+    """True if the hash was made with a different method or cost than configured"""
+    method = password_hash.split('$', 1)[0] if password_hash else None
+    return method != _method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
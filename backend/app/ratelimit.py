@@ -0,0 +1,168 @@
+import math
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from flask import current_app, jsonify, request, session
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+def parse_limits(spec):
+    """'ip=30/minute,username=10/minute' -> [('ip', 30, 60.0), ('username', 10, 60.0)]"""
+    limits = []
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        key, rate = part.split('=')
+        count, period = rate.split('/')
+        if key.strip() not in KEY_FUNCS:
+            raise ValueError(f'Unknown rate limit key: {key}')
+        limits.append((key.strip(), int(count), float(PERIODS[period.strip()])))
+    return limits
+
+def _username():
+    data = request.get_json(silent=True) if request.is_json else request.form
+    username = data.get('username') if data else None
+    return username.strip().lower() if isinstance(username, str) and username.strip() else None
+
+# How each kind of key is read from the request, without touching the database
+KEY_FUNCS = {
+    'ip': lambda: request.remote_addr,
+    'username': _username,
+    'user': lambda: session.get('_user_id'),
+}
+
+class MemoryRateLimiter:
+    """Per-process token buckets, stored as one timestamp per key (GCRA).
+
+    A bucket holding `limit` tokens that refill over `period` is the same
+    as remembering when the bucket will next be full, so a hit is one dict
+    read and one dict write with no lock. Two threads racing on the same
+    key can both be let through, which costs at most one extra request.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._full_at = {}
+        self._sweep_at = max_keys
+        self._sweep_lock = threading.Lock()
+
+    def hit(self, key, limit, period):
+        """Take a token; returns 0 if allowed, else seconds until one is free"""
+        now = time.monotonic()
+        full_at = max(self._full_at.get(key, now), now) + period / limit
+        wait = full_at - period - now
+        if wait > 0:
+            return wait
+        self._full_at[key] = full_at
+        if len(self._full_at) > self._sweep_at:
+            self._sweep(now)
+        return 0
+
+    def _sweep(self, now):
+        """Forget buckets that have refilled, since they behave like new keys"""
+        with self._sweep_lock:
+            self._full_at = {k: v for k, v in self._full_at.items() if v > now}
+            # Avoid sweeping on every hit while the table is legitimately large
+            self._sweep_at = max(self.max_keys, 2 * len(self._full_at))
+
+    def clear(self):
+        self._full_at = {}
+
+class RedisRateLimiter:
+    """Sliding-window counters in Redis, shared by every worker process.
+
+    Each hit is one pipelined round trip: INCR the current window and read
+    the previous one, weighting it by how much of it still overlaps the
+    last `period` seconds. Rejected hits are counted too, so a client
+    that keeps hammering stays limited.
+    """
+
+    def __init__(self, url=None, client=None, prefix='myrecipe:ratelimit:'):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError('RATE_LIMIT_BACKEND=redis requires the redis package')
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key, limit, period):
+        now = time.time()
+        window = int(now // period)
+        elapsed = (now % period) / period
+        current_key = f'{self.prefix}{key}:{window}'
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(period * 2))
+        pipe.get(f'{self.prefix}{key}:{window - 1}')
+        count, _, previous = pipe.execute()
+        previous = int(previous or 0)
+        if previous * (1 - elapsed) + count <= limit:
+            return 0
+        if count > limit:
+            return period * (1 - elapsed)
+        # Wait for enough of the previous window to slide out
+        return (previous * (1 - elapsed) + count - limit) / previous * period
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+class RateLimits:
+    """Named limits from RATE_LIMITS applied through one limiter backend"""
+
+    def __init__(self, limiter, limits, enabled=True):
+        self.limiter = limiter
+        self.limits = {name: parse_limits(spec) for name, spec in limits.items()}
+        self.enabled = enabled
+        self.rejected = defaultdict(int)
+
+    def check(self, name):
+        """Count this request against limit `name`; returns seconds to wait or 0"""
+        if not self.enabled:
+            return 0
+        for key_name, limit, period in self.limits.get(name, ()):
+            value = KEY_FUNCS[key_name]()
+            if value is None:
+                continue
+            wait = self.limiter.hit(f'{name}:{key_name}:{value}', limit, period)
+            if wait:
+                self.rejected[(name, key_name)] += 1
+                return wait
+        return 0
+
+def too_many_requests(wait):
+    response = jsonify({'error': 'Too many requests, please retry later', 'success': False})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+    return response
+
+def rate_limited(name):
+    """Reject requests over limit `name` before the view runs.
+
+    Safe methods are not counted, so GET on a form page stays free.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                wait = current_app.extensions['rate_limits'].check(name)
+                if wait:
+                    return too_many_requests(wait)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def init_rate_limits(app):
+    backend = app.config['RATE_LIMIT_BACKEND']
+    if backend == 'memory':
+        limiter = MemoryRateLimiter(max_keys=app.config['RATE_LIMIT_MAX_KEYS'])
+    elif backend == 'redis':
+        limiter = RedisRateLimiter(url=app.config['RATE_LIMIT_REDIS_URL'])
+    else:
+        raise ValueError(f'Unknown RATE_LIMIT_BACKEND: {backend}')
+    rate_limits = RateLimits(limiter, app.config['RATE_LIMITS'], app.config['RATE_LIMIT_ENABLED'])
+    app.extensions['rate_limits'] = rate_limits
+    return rate_limits
@@ -1,18 +1,235 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
-from .models import Recipe, Category, db
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.orm.exc import StaleDataError
+from .models import Recipe, Category, CategoryCount, User, db, recipe_categories
+from .search import search_recipes
+from .ingredients import match_pantry
+from .jobs import enqueue, job
+from .ratelimit import rate_limited
+from .routing import reads_from_replica
+from .similar import load_numpy, similar_recipes
+from .http_cache import (add_validators, if_match_versions, is_not_modified, make_etag,
+                         not_modified, version_etag)
+from .cache import CATEGORIES_KEY, get_cache, recipe_key
+from .bulk import export_ndjson, import_ndjson
+from .compression import attach_cache_entry
+from .serializers import (RECIPE_FIELDS, SUMMARY_FIELDS, recipe_query,
+                          serialize_category, serialize_recipe)
 from datetime import datetime
+import base64
+import json
 
 recipes = Blueprint('recipes', __name__)
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+DEFAULT_SIMILAR = 10
+MAX_SIMILAR = 50
+# Columns PATCH /recipes/<id> may set; category_ids is handled separately
+PATCH_FIELDS = ('title', 'description', 'ingredients', 'instructions')
+
+def _parse_fields(value):
+    """Return the requested fields in a stable order, or None if any is unknown"""
+    if not value:
+        return SUMMARY_FIELDS
+    requested = {f.strip() for f in value.split(',') if f.strip()}
+    if not requested or not requested <= set(RECIPE_FIELDS):
+        return None
+    return tuple(f for f in RECIPE_FIELDS if f in requested)
+
+def _parse_ids(value):
+    """Comma-separated ids as a list of ints; raises ValueError on bad input"""
+    return [int(v) for v in value.split(',') if v.strip()]
+
+def _parse_id_arg(name):
+    """Optional integer id query argument; raises ValueError on bad input"""
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer') from None
+
+def _cached_json(key, entry):
+    """200 response for a cache entry holding an encoded JSON body"""
+    response = current_app.response_class(entry['body'], mimetype='application/json')
+    attach_cache_entry(response, key, entry)
+    return add_validators(response, entry['etag'], entry['last_modified'])
+
+def _recipe_entry(recipe):
+    """Cache entry for GET /recipes/<id>"""
+    return {
+        'version': recipe.version,
+        'etag': version_etag('recipe', recipe.id, recipe.version),
+        'last_modified': recipe.updated_at,
+        'body': current_app.json.dump_bytes(serialize_recipe(recipe))
+    }
+
+def _fill_recipe_cache(recipe_id, entry):
+    """Store a freshly built entry unless a write has replaced it meanwhile.
+
+    Writers commit and then delete the key, so a fill that lands after that
+    delete would serve the old version to every worker until it expires.
+    On the shared backend the version is read again from the primary once
+    the entry is stored, and the key dropped if it has moved on.
+    """
+    cache = get_cache()
+    key = recipe_key(recipe_id)
+    cache.set(key, entry)
+    if not cache.shared:
+        return
+    with db.engine.connect() as conn:
+        version = conn.scalar(select(Recipe.version).where(Recipe.id == recipe_id))
+    if version != entry['version']:
+        cache.delete(key)
+
+def _enqueue_post_write(recipe_id, changed):
+    """Queue the follow-up work for a written recipe in the caller's transaction"""
+    if 'ingredients' in changed:
+        enqueue('index_ingredients', {'recipe_id': recipe_id}, key=f'index_ingredients:{recipe_id}')
+    if 'title' in changed or 'ingredients' in changed:
+        enqueue('index_similarity', {'recipe_ids': [recipe_id]}, key=f'index_similarity:{recipe_id}')
+    enqueue('warm_recipe', {'recipe_id': recipe_id}, key=f'warm_recipe:{recipe_id}')
+
+def _precondition_failed(recipe_id, version):
+    """412 carrying the current ETag, so the client can refetch and retry"""
+    response = jsonify({'error': 'Recipe was changed by another request'})
+    response.status_code = 412
+    response.set_etag(version_etag('recipe', recipe_id, version))
+    return response
+
+def _stale_write(recipe_id):
+    """Response for a flush that found the version it loaded already replaced"""
+    db.session.rollback()
+    version = db.session.query(Recipe.version).filter_by(id=recipe_id).scalar()
+    if version is None:
+        return jsonify({'error': 'Recipe not found'}), 404
+    return _precondition_failed(recipe_id, version)
+
+def _set_categories(recipe_id, category_ids):
+    """Make `category_ids` the recipe's categories by inserting and deleting
+    only the association rows that differ. Unknown ids are ignored."""
+    current = set(db.session.scalars(
+        select(recipe_categories.c.category_id).where(recipe_categories.c.recipe_id == recipe_id)))
+    removed = current - category_ids
+    added = category_ids - current
+    if added:
+        added = set(db.session.scalars(select(Category.id).where(Category.id.in_(added))))
+    if removed:
+        db.session.execute(delete(recipe_categories).where(
+            recipe_categories.c.recipe_id == recipe_id,
+            recipe_categories.c.category_id.in_(removed)))
+    if added:
+        db.session.execute(insert(recipe_categories),
+                           [{'recipe_id': recipe_id, 'category_id': c} for c in sorted(added)])
+
+@job('warm_recipe')
+def warm_recipe(payload):
+    """Fill the cache entry of a recently written recipe before it is read"""
+    recipe = recipe_query().filter_by(id=payload['recipe_id']).first()
+    if recipe is not None:
+        _fill_recipe_cache(recipe.id, _recipe_entry(recipe))
+
+def _encode_cursor(recipe):
+    payload = json.dumps([recipe.created_at.isoformat(), recipe.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def _decode_cursor(token):
+    padded = token + '=' * (-len(token) % 4)
+    created_at, recipe_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    return datetime.fromisoformat(created_at), int(recipe_id)
+
+def _parse_page():
+    """limit and decoded cursor from the query string; raises ValueError"""
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return limit, None
+    try:
+        return limit, _decode_cursor(cursor)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def _keyset_page(query, limit, cursor):
+    """Newest-first page of `query` after `cursor`; returns (rows, next_cursor).
+
+    Ordering and seeking on (created_at, id) is answered by
+    ix_recipes_created_at, or by ix_recipes_user_id when the query filters
+    on one user, so only the rows of the page are read from the table.
+    """
+    if cursor:
+        cursor_created_at, cursor_id = cursor
+        # A row-value comparison, so SQLite seeks to the cursor in the index
+        # instead of scanning down to it as it would for the OR form
+        query = query.filter(tuple_(Recipe.created_at, Recipe.id) < (cursor_created_at, cursor_id))
+    # Fetch one extra row to find out whether another page exists
+    rows = query.order_by(Recipe.created_at.desc(), Recipe.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1])
+    return rows, next_cursor
+
+def _feed_response(rows, next_cursor, fields=SUMMARY_FIELDS):
+    """Page response with an ETag derived from the rows themselves.
+
+    Every write bumps a recipe's version, so the ids and versions of the
+    page (and whether another page follows) identify it without any
+    query beyond the page itself.
+    """
+    etag = make_etag('feed', request.query_string.decode(), next_cursor,
+                     [(r.id, r.version) for r in rows])
+    if is_not_modified(etag):
+        return not_modified(etag, None)
+    return add_validators(jsonify({
+        'recipes': [serialize_recipe(recipe, fields) for recipe in rows],
+        'next_cursor': next_cursor
+    }), etag, None)
+
+def _categories_etag(max_id, count):
+    # Categories are only ever added, so max(id) and the count identify the list
+    return make_etag('categories', max_id, count)
+
 @recipes.route('/categories', methods=['GET'])
+@reads_from_replica(snapshot=False)
 def get_categories():
-    categories = Category.query.all()
-    return jsonify([{
-        'id': category.id,
-        'name': category.name,
-        'description': category.description
-    } for category in categories])
+    cache = get_cache()
+    entry = cache.get(CATEGORIES_KEY)
+    if entry is not None and not cache.shared:
+        # Another worker may have added a category and cleared only its own cache
+        max_id, count = db.session.query(func.max(Category.id), func.count(Category.id)).one()
+        if entry['etag'] != _categories_etag(max_id, count):
+            entry = None
+    if entry is None:
+        categories = [serialize_category(category) for category in Category.query.all()]
+        entry = {
+            'etag': _categories_etag(max((c['id'] for c in categories), default=None), len(categories)),
+            'last_modified': None,
+            'body': current_app.json.dump_bytes(categories)
+        }
+        cache.set(CATEGORIES_KEY, entry)
+
+    if is_not_modified(entry['etag']):
+        return not_modified(entry['etag'])
+    return _cached_json(CATEGORIES_KEY, entry)
+
+@recipes.route('/categories/facets', methods=['GET'])
+@reads_from_replica()
+def get_category_facets():
+    """Recipe count per category, read from the maintained counter table"""
+    rows = (db.session.query(Category.id, Category.name,
+                             func.coalesce(CategoryCount.recipe_count, 0))
+            .outerjoin(CategoryCount, CategoryCount.category_id == Category.id)
+            .order_by(Category.name)
+            .all())
+    return jsonify([{'id': id, 'name': name, 'recipe_count': count} for id, name, count in rows])
 
 @recipes.route('/categories', methods=['POST'])
 @login_required
@@ -24,37 +241,150 @@ def create_category():
     )
     db.session.add(category)
     db.session.commit()
+    get_cache().delete(CATEGORIES_KEY)
     return jsonify({
         'message': 'Category created successfully',
-        'category': {
-            'id': category.id,
-            'name': category.name,
-            'description': category.description
-        }
+        'category': serialize_category(category)
     }), 201
 
 @recipes.route('/recipes', methods=['GET'])
+@reads_from_replica()
 def get_recipes():
     user_id = request.args.get('user_id')
-    
+
     try:
-        query = Recipe.query
+        limit, cursor = _parse_page()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    fields = _parse_fields(request.args.get('fields'))
+    if fields is None:
+        return jsonify({'error': 'Unknown field requested'}), 400
+
+    # ?categories=1,2&match=all|any filters through the association table
+    try:
+        category_ids = _parse_ids(request.args.get('categories', ''))
+    except ValueError:
+        return jsonify({'error': 'categories must be a list of ids'}), 400
+    match = request.args.get('match', 'any')
+    if match not in ('any', 'all'):
+        return jsonify({'error': 'match must be any or all'}), 400
+
+    try:
+        query = recipe_query(fields)
         if user_id:
             query = query.filter_by(user_id=user_id)
-        recipes_list = query.all()
-            
-        return jsonify([{
-            'id': recipe.id,
-            'title': recipe.title,
-            'description': recipe.description,
-            'ingredients': recipe.ingredients,
-            'instructions': recipe.instructions,
-            'created_at': recipe.created_at,
-            'updated_at': recipe.updated_at,
-            'user_id': recipe.user_id,
-            'author': recipe.author.username,
-            'categories': [{'id': c.id, 'name': c.name} for c in recipe.categories]
-        } for recipe in recipes_list])
+        if category_ids:
+            matching = (db.select(recipe_categories.c.recipe_id)
+                        .where(recipe_categories.c.category_id.in_(category_ids)))
+            if match == 'all':
+                matching = (matching.group_by(recipe_categories.c.recipe_id)
+                            .having(func.count() == len(set(category_ids))))
+            query = query.filter(Recipe.id.in_(matching))
+        return _feed_response(*_keyset_page(query, limit, cursor), fields=fields)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@recipes.route('/recipes/latest', methods=['GET'])
+@reads_from_replica()
+def get_latest_recipes():
+    """Site-wide feed of the newest recipes, summary fields only"""
+    try:
+        limit, cursor = _parse_page()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        return _feed_response(*_keyset_page(recipe_query(SUMMARY_FIELDS), limit, cursor))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@recipes.route('/users/<int:user_id>/recipes', methods=['GET'])
+@reads_from_replica()
+def get_user_recipes(user_id):
+    """One user's recipes, newest first, summary fields only"""
+    try:
+        limit, cursor = _parse_page()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if db.session.get(User, user_id) is None:
+        return jsonify({'error': 'User not found'}), 404
+
+    try:
+        query = recipe_query(SUMMARY_FIELDS).filter(Recipe.user_id == user_id)
+        return _feed_response(*_keyset_page(query, limit, cursor))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@recipes.route('/recipes/search', methods=['GET'])
+@reads_from_replica()
+def search():
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'Missing search query'}), 400
+
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    try:
+        category_id = _parse_id_arg('category')
+        user_id = _parse_id_arg('user_id')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        hits = search_recipes(q, category_id=category_id, user_id=user_id, limit=limit)
+        found = recipe_query(SUMMARY_FIELDS).filter(Recipe.id.in_([h.recipe_id for h in hits])).all()
+        by_id = {recipe.id: recipe for recipe in found}
+
+        results = []
+        for hit in hits:
+            recipe = by_id.get(hit.recipe_id)
+            if recipe is None:
+                continue
+            data = serialize_recipe(recipe, SUMMARY_FIELDS)
+            data['rank'] = hit.rank
+            data['snippet'] = hit.snippet
+            results.append(data)
+        return jsonify({'recipes': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@recipes.route('/recipes/pantry', methods=['GET'])
+@reads_from_replica()
+def cook_with():
+    pantry = [p for p in request.args.get('ingredients', '').split(',') if p.strip()]
+    if not pantry:
+        return jsonify({'error': 'Missing ingredients'}), 400
+
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    try:
+        matches = match_pantry(pantry, limit=limit)
+        found = recipe_query(SUMMARY_FIELDS).filter(Recipe.id.in_([m.recipe_id for m in matches])).all()
+        by_id = {recipe.id: recipe for recipe in found}
+
+        results = []
+        for match in matches:
+            recipe = by_id.get(match.recipe_id)
+            if recipe is None:
+                continue
+            data = serialize_recipe(recipe, SUMMARY_FIELDS)
+            data['matched'] = match.matched
+            data['missing'] = match.total - match.matched
+            data['score'] = match.matched / match.total
+            results.append(data)
+        return jsonify({'recipes': results})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -79,26 +409,62 @@ def create_recipe():
         if 'categories' in data and isinstance(data['categories'], list):
             categories = Category.query.filter(Category.id.in_(data['categories'])).all()
             recipe.categories = categories
-        
+
         db.session.add(recipe)
+        db.session.flush()
+        _enqueue_post_write(recipe.id, changed=data)
         db.session.commit()
+        get_cache().delete(recipe_key(recipe.id))
         
-        return jsonify({
-            'id': recipe.id,
-            'title': recipe.title,
-            'description': recipe.description,
-            'ingredients': recipe.ingredients,
-            'instructions': recipe.instructions,
-            'created_at': recipe.created_at,
-            'updated_at': recipe.updated_at,
-            'user_id': recipe.user_id,
-            'categories': [{'id': c.id, 'name': c.name} for c in recipe.categories]
-        }), 201
+        return jsonify(serialize_recipe(recipe)), 201
     
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@recipes.route('/recipes/bulk', methods=['POST'])
+@login_required
+@rate_limited('bulk_import')
+def bulk_import():
+    """Import recipes from an NDJSON request body, one recipe per line"""
+    inserted, errors = import_ndjson(request.stream, current_user.id,
+                                     batch_size=current_app.config['BULK_BATCH_SIZE'])
+    return jsonify({'inserted': inserted, 'errors': errors})
+
+@recipes.route('/recipes/export', methods=['GET'])
+@reads_from_replica()
+def export_recipes():
+    user_id = request.args.get('user_id', type=int)
+    return Response(stream_with_context(export_ndjson(user_id)), mimetype='application/x-ndjson')
+
+@recipes.route('/recipes/<int:recipe_id>/similar', methods=['GET'])
+@reads_from_replica()
+def get_similar_recipes(recipe_id):
+    """Recipes sharing the most title words and ingredients with this one"""
+    if load_numpy() is None:
+        return jsonify({'error': 'Similar recipes require numpy'}), 501
+    k = request.args.get('k', DEFAULT_SIMILAR, type=int)
+    if k is None or not 1 <= k <= MAX_SIMILAR:
+        return jsonify({'error': f'k must be between 1 and {MAX_SIMILAR}'}), 400
+
+    recipe = db.session.get(Recipe, recipe_id)
+    if recipe is None:
+        return jsonify({'error': 'Recipe not found'}), 404
+
+    try:
+        neighbours = similar_recipes(recipe, k)
+        rows = {r.id: r for r in recipe_query(SUMMARY_FIELDS)
+                .filter(Recipe.id.in_([recipe_id for recipe_id, _ in neighbours]))}
+        results = []
+        for neighbour_id, similarity in neighbours:
+            if neighbour_id in rows:
+                data = serialize_recipe(rows[neighbour_id], SUMMARY_FIELDS)
+                data['similarity'] = round(similarity, 3)
+                results.append(data)
+        return jsonify({'recipes': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @recipes.route('/recipes/<int:recipe_id>', methods=['PUT'])
 @login_required
 def update_recipe(recipe_id):
@@ -106,6 +472,10 @@ def update_recipe(recipe_id):
         
     if recipe.user_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
+
+    expected = if_match_versions('recipe', recipe_id)
+    if expected is not None and recipe.version not in expected:
+        return _precondition_failed(recipe_id, recipe.version)
     
     data = request.get_json()
     
@@ -122,23 +492,80 @@ def update_recipe(recipe_id):
             categories = Category.query.filter(Category.id.in_(data['category_ids'])).all()
             recipe.categories = categories
         
+        _enqueue_post_write(recipe_id, changed=data)
         db.session.commit()
+        get_cache().delete(recipe_key(recipe_id))
         
-        return jsonify({
+        response = jsonify({
             'message': 'Recipe updated successfully',
-            'recipe': {
-                'id': recipe.id,
-                'title': recipe.title,
-                'description': recipe.description,
-                'ingredients': recipe.ingredients,
-                'instructions': recipe.instructions,
-                'created_at': recipe.created_at,
-                'updated_at': recipe.updated_at,
-                'user_id': recipe.user_id,
-                'categories': [{'id': c.id, 'name': c.name} for c in recipe.categories]
-            }
+            'recipe': serialize_recipe(recipe)
         })
+        response.set_etag(version_etag('recipe', recipe_id, recipe.version))
+        return response
     
+    except StaleDataError:
+        # Another write committed between loading the recipe and this one
+        return _stale_write(recipe_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@recipes.route('/recipes/<int:recipe_id>', methods=['PATCH'])
+@login_required
+def patch_recipe(recipe_id):
+    """Update only the fields present in the body, in a single UPDATE.
+
+    An If-Match precondition is part of that UPDATE's WHERE clause, so no
+    read comes before the write. The row is only read when the UPDATE
+    matches nothing, to tell a missing recipe (404), someone else's (403)
+    and a stale ETag (412) apart.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    if not data:
+        return jsonify({'error': 'No fields to update'}), 400
+    unknown = set(data) - set(PATCH_FIELDS) - {'category_ids'}
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    changes = {f: data[f] for f in PATCH_FIELDS if f in data}
+    if not all(isinstance(value, str) for value in changes.values()):
+        return jsonify({'error': 'Fields must be strings'}), 400
+    category_ids = data.get('category_ids')
+    if 'category_ids' in data and not (isinstance(category_ids, list)
+                                       and all(isinstance(c, int) for c in category_ids)):
+        return jsonify({'error': 'category_ids must be a list of ids'}), 400
+
+    expected = if_match_versions('recipe', recipe_id)
+    try:
+        statement = (update(Recipe)
+                     .where(Recipe.id == recipe_id, Recipe.user_id == current_user.id)
+                     .values(**changes, updated_at=datetime.utcnow(), version=Recipe.version + 1)
+                     .returning(Recipe.version, Recipe.updated_at))
+        if expected is not None:
+            statement = statement.where(Recipe.version.in_(expected))
+        row = db.session.execute(statement, execution_options={'synchronize_session': False}).first()
+        if row is None:
+            db.session.rollback()
+            current = db.session.query(Recipe.user_id, Recipe.version).filter_by(id=recipe_id).first()
+            if current is None:
+                return jsonify({'error': 'Recipe not found'}), 404
+            if current.user_id != current_user.id:
+                return jsonify({'error': 'Unauthorized'}), 403
+            return _precondition_failed(recipe_id, current.version)
+
+        if category_ids is not None:
+            _set_categories(recipe_id, set(category_ids))
+        _enqueue_post_write(recipe_id, changed=data)
+        db.session.commit()
+        get_cache().delete(recipe_key(recipe_id))
+
+        response = jsonify({
+            'message': 'Recipe updated successfully',
+            'recipe': {'id': recipe_id, **changes, 'updated_at': row.updated_at}
+        })
+        response.set_etag(version_etag('recipe', recipe_id, row.version))
+        return response
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -150,27 +577,43 @@ def delete_recipe(recipe_id):
         
     if recipe.user_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
+
+    expected = if_match_versions('recipe', recipe_id)
+    if expected is not None and recipe.version not in expected:
+        return _precondition_failed(recipe_id, recipe.version)
     
     try:
         db.session.delete(recipe)
         db.session.commit()
+        get_cache().delete(recipe_key(recipe_id))
         return jsonify({'message': 'Recipe deleted successfully'})
+    except StaleDataError:
+        return _stale_write(recipe_id)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @recipes.route('/recipes/<int:recipe_id>', methods=['GET'])
+@reads_from_replica(snapshot=False)
 def get_recipe(recipe_id):
-    recipe = Recipe.query.get_or_404(recipe_id)
-    return jsonify({
-        'id': recipe.id,
-        'title': recipe.title,
-        'description': recipe.description,
-        'ingredients': recipe.ingredients,
-        'instructions': recipe.instructions,
-        'created_at': recipe.created_at,
-        'updated_at': recipe.updated_at,
-        'user_id': recipe.user_id,
-        'author': recipe.author.username,
-        'categories': [{'id': c.id, 'name': c.name} for c in recipe.categories]
-    }) 
\ No newline at end of file
+    cache = get_cache()
+    key = recipe_key(recipe_id)
+    entry = cache.get(key)
+    if entry is not None and not cache.shared:
+        # A write in another worker only cleared that worker's cache; a
+        # primary-key lookup of the version tells if this copy is current
+        version = db.session.query(Recipe.version).filter_by(id=recipe_id).scalar()
+        if version != entry.get('version'):
+            cache.delete(key)
+            entry = None
+    if entry is None:
+        entry = _recipe_entry(recipe_query().filter_by(id=recipe_id).first_or_404())
+        _fill_recipe_cache(recipe_id, entry)
+
+    if is_not_modified(entry['etag'], entry['last_modified']):
+        return not_modified(entry['etag'], entry['last_modified'])
+    return _cached_json(key, entry)
+
+@recipes.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(get_cache().stats())
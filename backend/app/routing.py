@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import wraps
+from flask import current_app, has_request_context, session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from . import db
+from .database import apply_pragmas
+from .jobs import enqueue, job
+from .metrics import instrument_engine
+
+class ReadRouter:
+    """Chooses the engine read-only views query.
+
+    'primary' sends everything to the primary engine. 'readonly' reads
+    the primary file through a separate pool of mode=ro connections, so
+    long reads never hold the connections writers need. 'snapshot' reads
+    a copy of the database made with the SQLite backup API every
+    DB_SNAPSHOT_INTERVAL seconds; a client whose last write is newer than
+    the copy reads from the primary until the next copy.
+    """
+
+    def __init__(self, app, primary):
+        config = app.config
+        self.mode = config['DB_READ_ROUTING']
+        self.primary = primary
+        self.engine = None
+        self.snapshot_path = config['DB_SNAPSHOT_PATH']
+        self.snapshot_mtime = None
+        self.lock = threading.Lock()
+        path = primary.url.database
+        if self.mode == 'primary' or primary.dialect.name != 'sqlite' or path in (None, '', ':memory:'):
+            self.mode = 'primary'
+            return
+        if self.mode == 'readonly':
+            uri = f'file:{os.path.abspath(path)}?mode=ro&uri=true'
+        elif self.mode == 'snapshot':
+            # The copy is replaced by rename and never changed in place
+            uri = f'file:{os.path.abspath(self.snapshot_path)}?mode=ro&immutable=1&uri=true'
+        else:
+            raise ValueError(f'Unknown DB_READ_ROUTING: {self.mode}')
+        self.engine = create_engine(
+            'sqlite:///' + uri,
+            pool_size=config['DB_READ_POOL_SIZE'],
+            max_overflow=config['DB_READ_POOL_SIZE'] * 2,
+            connect_args={'check_same_thread': False})
+        profile = config['SQLITE_PROFILE']
+        event.listen(self.engine, 'connect',
+            lambda dbapi_conn, record: apply_pragmas(dbapi_conn, profile, read_only=True))
+        instrument_engine(self.engine)
+
+    def engine_for_request(self, snapshot=True):
+        """Engine for this request's reads, or None for the primary"""
+        if self.mode == 'readonly':
+            return self.engine
+        if self.mode != 'snapshot' or not snapshot:
+            return None
+        try:
+            mtime = os.stat(self.snapshot_path).st_mtime
+        except FileNotFoundError:
+            return None
+        if mtime != self.snapshot_mtime:
+            with self.lock:
+                if mtime != self.snapshot_mtime:
+                    # Pooled connections still point at the previous copy
+                    self.engine.dispose()
+                    self.snapshot_mtime = mtime
+        if session.get('_wrote_at', 0) >= mtime:
+            return None
+        return self.engine
+
+    def refresh_snapshot(self):
+        """Copy the primary into a new snapshot file and swap it in.
+
+        The file's mtime is set to when the copy started, which is the
+        point in time it reflects.
+        """
+        started = time.time()
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            with self.primary.connect() as conn:
+                dest = sqlite3.connect(tmp_path)
+                try:
+                    conn.connection.driver_connection.backup(dest)
+                    # Readers open the copy read-only, which WAL does not allow
+                    dest.execute('PRAGMA journal_mode=DELETE')
+                finally:
+                    dest.close()
+            os.utime(tmp_path, (started, started))
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+def reads_from_replica(snapshot=True):
+    """Route the view's queries through the read engine.
+
+    Views that fill the shared cache pass snapshot=False: an entry built
+    from a lagging copy would be served to everyone until it expires.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            engine = current_app.extensions['read_router'].engine_for_request(snapshot)
+            if engine is not None:
+                db.session.info['read_engine'] = engine
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@event.listens_for(Session, 'after_flush')
+def _mark_written(db_session, flush_context):
+    db_session.info['wrote'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _remember_write_time(db_session):
+    # Recorded after the commit, so any snapshot started later includes it
+    if (db_session.info.get('wrote') and has_request_context()
+            and current_app.extensions['read_router'].mode == 'snapshot'):
+        session['_wrote_at'] = time.time()
+
+def _reset_routing(exc):
+    db.session.info.pop('read_engine', None)
+    db.session.info.pop('wrote', None)
+
+@job('refresh_snapshot')
+def refresh_snapshot_job(payload):
+    current_app.extensions['read_router'].refresh_snapshot()
+    enqueue('refresh_snapshot', key='refresh_snapshot', delay=current_app.config['DB_SNAPSHOT_INTERVAL'])
+
+def init_read_routing(app, primary):
+    """Set up the read engine; call inside an app context after migrations"""
+    router = ReadRouter(app, primary)
+    app.extensions['read_router'] = router
+    # Streamed responses keep the request open, so reset at teardown
+    app.teardown_request(_reset_routing)
+    if router.mode == 'snapshot':
+        if not os.path.exists(router.snapshot_path):
+            router.refresh_snapshot()
+        enqueue('refresh_snapshot', key='refresh_snapshot', delay=app.config['DB_SNAPSHOT_INTERVAL'])
+        db.session.commit()
+    return router
@@ -0,0 +1,90 @@
+import html
+from collections import namedtuple
+from sqlalchemy import text
+from . import db
+
+# External-content FTS5 index over the searchable recipe columns. The
+# triggers keep it in sync with every INSERT, UPDATE and DELETE on recipes.
+FTS_SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+        title, description, ingredients, instructions,
+        content='recipes', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, title, description, ingredients, instructions)
+        VALUES (new.id, new.title, new.description, new.ingredients, new.instructions);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, description, ingredients, instructions)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients, old.instructions);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_au
+    AFTER UPDATE OF title, description, ingredients, instructions ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, description, ingredients, instructions)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients, old.instructions);
+        INSERT INTO recipes_fts(rowid, title, description, ingredients, instructions)
+        VALUES (new.id, new.title, new.description, new.ingredients, new.instructions);
+    END
+    '''
+]
+
+# snippet() wraps matches in these control characters rather than in markup,
+# so the stored text can be HTML-escaped before the <mark> tags are added.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+SearchHit = namedtuple('SearchHit', ['recipe_id', 'rank', 'snippet'])
+
+# bm25() column weights: title, description, ingredients, instructions
+BM25_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+def rebuild_index():
+    """Repopulate the FTS index from the recipes table"""
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')"))
+
+def build_match_query(q):
+    """Turn free text into an FTS5 query that matches every word.
+
+    Each word is quoted so user input can never be parsed as FTS5 syntax.
+    """
+    terms = ['"%s"' % word.replace('"', '""') for word in q.split()]
+    return ' '.join(terms)
+
+def highlight_snippet(raw):
+    """Escape a raw snippet() result and mark up the matched terms"""
+    escaped = html.escape(raw)
+    return escaped.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+def search_recipes(q, category_id=None, user_id=None, limit=20):
+    """Return SearchHit rows for `q`, best match first.
+
+    The snippet is HTML-escaped, with matches wrapped in <mark> tags.
+    """
+    sql = '''
+        SELECT recipes_fts.rowid AS recipe_id,
+               bm25(recipes_fts, {weights}) AS rank,
+               snippet(recipes_fts, -1, :match_start, :match_end, '...', 16) AS snippet
+        FROM recipes_fts
+    '''.format(weights=', '.join(str(w) for w in BM25_WEIGHTS))
+    params = {'q': build_match_query(q), 'limit': limit,
+              'match_start': MATCH_START, 'match_end': MATCH_END}
+    if user_id is not None:
+        sql += ' JOIN recipes ON recipes.id = recipes_fts.rowid AND recipes.user_id = :user_id'
+        params['user_id'] = user_id
+    sql += ' WHERE recipes_fts MATCH :q'
+    if category_id is not None:
+        sql += (' AND recipes_fts.rowid IN (SELECT recipe_id FROM recipe_categories'
+                ' WHERE category_id = :category_id)')
+        params['category_id'] = category_id
+    sql += ' ORDER BY rank LIMIT :limit'
+    rows = db.session.execute(text(sql), params).all()
+    return [SearchHit(row.recipe_id, row.rank, highlight_snippet(row.snippet)) for row in rows]
@@ -0,0 +1,74 @@
+from functools import lru_cache
+from operator import attrgetter
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, noload, selectinload
+from .models import Category, Recipe, User
+
+# Plain columns that can be selected through ?fields=
+RECIPE_COLUMNS = ('id', 'title', 'description', 'ingredients', 'instructions',
+                  'created_at', 'updated_at', 'user_id')
+RECIPE_FIELDS = RECIPE_COLUMNS + ('author', 'categories')
+# Listings leave out the large text columns unless they are asked for
+SUMMARY_FIELDS = ('id', 'title', 'description', 'created_at', 'updated_at',
+                  'user_id', 'author', 'categories')
+
+def recipe_query(fields=RECIPE_FIELDS):
+    """Recipe query that only loads what `fields` needs.
+
+    Authors are joined into the main SELECT and categories come from one
+    extra IN query, so the statement count does not depend on the number
+    of rows returned.
+    """
+    columns = [getattr(Recipe, f) for f in fields if f in RECIPE_COLUMNS]
+    # created_at and id are always needed to build pagination cursors, and
+    # version to build ETags
+    query = Recipe.query.options(load_only(Recipe.id, Recipe.created_at, Recipe.version, *columns))
+    if 'author' in fields:
+        query = query.options(joinedload(Recipe.author).load_only(User.username))
+    else:
+        query = query.options(noload(Recipe.author))
+    if 'categories' in fields:
+        query = query.options(selectinload(Recipe.categories))
+    else:
+        query = query.options(noload(Recipe.categories))
+    return query
+
+def compile_serializer(model, fields=None, exclude=()):
+    """Build a serializer for `model` once, from its column metadata.
+
+    The returned function reads all columns with a single attrgetter and
+    zips them into a dict, instead of walking field names on every call.
+    """
+    if fields is None:
+        fields = [attr.key for attr in inspect(model).column_attrs]
+    names = tuple(f for f in fields if f not in exclude)
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return lambda obj: {names[0]: getter(obj)}
+    return lambda obj: dict(zip(names, getter(obj)))
+
+serialize_category = compile_serializer(Category)
+# The identity fields only: recipe_count changes through triggers, so the
+# cached user snapshots and session claims behind /check-auth cannot carry
+# it. GET /users/<id> reads it fresh.
+serialize_user = compile_serializer(User, fields=('id', 'username', 'email'))
+_serialize_category_ref = compile_serializer(Category, fields=('id', 'name'))
+
+@lru_cache(maxsize=64)
+def _recipe_serializer(fields):
+    columns = [f for f in fields if f in RECIPE_COLUMNS]
+    serialize_columns = compile_serializer(Recipe, fields=columns) if columns else dict
+    with_author = 'author' in fields
+    with_categories = 'categories' in fields
+
+    def serialize(recipe):
+        data = serialize_columns(recipe) if columns else {}
+        if with_author:
+            data['author'] = recipe.author.username
+        if with_categories:
+            data['categories'] = [_serialize_category_ref(c) for c in recipe.categories]
+        return data
+    return serialize
+
+def serialize_recipe(recipe, fields=RECIPE_FIELDS):
+    return _recipe_serializer(tuple(fields))(recipe)
@@ -0,0 +1,117 @@
+import os
+import time
+from flask import current_app, has_app_context, request, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from . import db
+from .cache import LRUCache
+from .models import User
+
+CLAIMS_KEY = 'user_claims'
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+def touch_user_stamp(path):
+    """Tell every worker that cached users are stale.
+
+    Workers compare the stamp's mtime with what they last saw, so commands
+    that write users outside the server (flask users reset-password) can
+    invalidate caches without talking to it.
+    """
+    with open(path, 'a'):
+        os.utime(path, None)
+
+def _stamp_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+def _attach(data):
+    """Bring a cached user snapshot into the current session without a query"""
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def _claims(user):
+    return {'id': user.id, 'username': user.username, 'email': user.email, 'iat': time.time()}
+
+def remember_claims(user):
+    """Store the user's minimal identity in the signed session cookie"""
+    session[CLAIMS_KEY] = _claims(user)
+
+def forget_claims():
+    session.pop(CLAIMS_KEY, None)
+
+class SessionUserLoader:
+    """Flask-Login user loader backed by a bounded TTL cache.
+
+    Cached entries are dropped when a user row is updated or deleted
+    through the ORM, and all entries are dropped when the stamp file
+    changes. With SESSION_CLAIMS_FOR_READS, read-only requests are
+    answered from the session claims without the cache or the database.
+    """
+
+    def __init__(self, app):
+        self.cache = LRUCache(maxsize=app.config['SESSION_USER_CACHE_SIZE'],
+                              ttl=app.config['SESSION_USER_CACHE_TTL'])
+        self.stamp_path = app.config['USER_CACHE_STAMP']
+        self.stamp_seen = _stamp_mtime(self.stamp_path)
+        self.claims_for_reads = app.config['SESSION_CLAIMS_FOR_READS']
+
+    def _check_stamp(self):
+        mtime = _stamp_mtime(self.stamp_path)
+        if mtime != self.stamp_seen:
+            self.cache.clear()
+            self.stamp_seen = mtime
+        return mtime
+
+    def __call__(self, user_id):
+        user_id = int(user_id)
+        stamp = self._check_stamp()
+
+        if self.claims_for_reads and request.method in READ_ONLY_METHODS:
+            claims = session.get(CLAIMS_KEY)
+            if claims and claims['id'] == user_id and claims['iat'] > stamp:
+                return _attach({k: claims[k] for k in ('id', 'username', 'email')})
+
+        snapshot = self.cache.get(user_id)
+        if snapshot is not None:
+            return _attach(snapshot)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            if self.claims_for_reads and CLAIMS_KEY not in session:
+                remember_claims(user)
+            self.cache.set(user_id, {
+                'id': user.id,
+                'username': user.username,
+                'email': user.email,
+                'password_hash': user.password_hash
+            })
+        return user
+
+    def invalidate(self, user_ids):
+        self.cache.delete(*user_ids)
+        touch_user_stamp(self.stamp_path)
+        self.stamp_seen = _stamp_mtime(self.stamp_path)
+
+def init_user_loader(app, login_manager):
+    loader = SessionUserLoader(app)
+    login_manager.user_loader(loader)
+    app.extensions['session_user_loader'] = loader
+    return loader
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _record_change(mapper, connection, target):
+    object_session(target).info.setdefault('changed_user_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed(session):
+    changed = session.info.pop('changed_user_ids', None)
+    if changed and has_app_context() and 'session_user_loader' in current_app.extensions:
+        current_app.extensions['session_user_loader'].invalidate(changed)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('changed_user_ids', None)
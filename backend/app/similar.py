@@ -0,0 +1,240 @@
+import threading
+import time
+import zlib
+from flask import current_app
+from sqlalchemy import select, text
+from . import db
+from .ingredients import WORD_RE, normalize_token, parse_ingredients
+from .jobs import job
+from .models import Recipe, RecipeSignature
+
+# numpy takes longer to import than the rest of the app together, so it is
+# loaded by load_numpy() on first use rather than at startup
+np = None
+_numpy_loaded = False
+
+NUM_HASHES = 64
+# Fixed so every process and every rebuild hashes the same way
+HASH_SEED = 20240601
+# Tokens hashed per vectorized step, bounding the temporary matrix to ~25 MB
+CHUNK_TOKENS = 50000
+TITLE_STOPWORDS = {'a', 'an', 'and', 'the', 'with', 'of', 'in', 'on', 'for', 'my',
+                   'easy', 'best', 'quick', 'simple', 'recipe', 'style', 'homemade'}
+
+UPSERT = text('''
+    INSERT INTO recipe_signatures (recipe_id, signature, version)
+    VALUES (:recipe_id, :signature, (SELECT COALESCE(MAX(version), 0) + 1 FROM recipe_signatures))
+    ON CONFLICT (recipe_id) DO UPDATE SET signature = excluded.signature, version = excluded.version
+''')
+
+def _hash_params():
+    rng = np.random.default_rng(HASH_SEED)
+    # Multiply-shift hashing: odd 64-bit multipliers, top 32 bits of the product
+    a = rng.integers(1, 2 ** 63, size=NUM_HASHES, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=NUM_HASHES, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+_params = None
+
+def load_numpy():
+    """Import numpy on first call; returns the module, or None if it is missing"""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy_loaded = True
+    return np
+
+def recipe_tokens(title, ingredients):
+    """The feature set of a recipe: normalized title words and ingredient tokens"""
+    tokens = {normalize_token(w) for w in WORD_RE.findall((title or '').lower())
+              if w not in TITLE_STOPWORDS}
+    tokens.update(token for token, _, _ in parse_ingredients(ingredients or ''))
+    tokens.discard(None)
+    return tokens
+
+def compute_signatures(token_sets):
+    """MinHash signatures for a list of token sets, as an (n, NUM_HASHES) uint16 array.
+
+    All tokens of a chunk of recipes are hashed in one NumPy expression and
+    reduced per recipe with minimum.reduceat. Only the low 16 bits of each
+    minimum are kept (b-bit MinHash), which halves the index at a
+    negligible cost in accuracy. Rows for empty sets are left as zeros.
+    """
+    global _params
+    if _params is None:
+        load_numpy()
+        _params = _hash_params()
+    a, b = _params
+    signatures = np.zeros((len(token_sets), NUM_HASHES), dtype=np.uint16)
+    start = 0
+    while start < len(token_sets):
+        rows, hashes, offsets, count = [], [], [], 0
+        end = start
+        while end < len(token_sets) and (count < CHUNK_TOKENS or not rows):
+            tokens = token_sets[end]
+            if tokens:
+                rows.append(end)
+                offsets.append(count)
+                hashes.extend(zlib.crc32(t.encode()) for t in tokens)
+                count += len(tokens)
+            end += 1
+        if rows:
+            x = np.array(hashes, dtype=np.uint64)[None, :]
+            values = (a * x + b) >> np.uint64(32)
+            minimums = np.minimum.reduceat(values, offsets, axis=1)
+            signatures[rows] = (minimums.T & np.uint64(0xFFFF)).astype(np.uint16)
+        start = end
+    return signatures
+
+def index_recipes(recipe_ids):
+    """Recompute and store the signatures of `recipe_ids` in the current transaction"""
+    rows = db.session.execute(
+        select(Recipe.id, Recipe.title, Recipe.ingredients).where(Recipe.id.in_(recipe_ids))
+    ).all()
+    token_sets = [recipe_tokens(title, ingredients) for _, title, ingredients in rows]
+    signatures = compute_signatures(token_sets)
+    params = [{'recipe_id': recipe_id, 'signature': sig.tobytes() if tokens else None}
+              for (recipe_id, _, _), tokens, sig in zip(rows, token_sets, signatures)]
+    if params:
+        db.session.execute(UPSERT, params)
+
+def rebuild_similarity_index(batch_size=5000):
+    """Compute signatures for every recipe, committing one batch at a time"""
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(Recipe.id).where(Recipe.id > last_id).order_by(Recipe.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        index_recipes(ids)
+        db.session.commit()
+        last_id = ids[-1]
+    # Recipes deleted before the table existed never got a tombstone
+    db.session.execute(text(
+        'DELETE FROM recipe_signatures WHERE recipe_id NOT IN (SELECT id FROM recipes)'))
+    db.session.commit()
+
+@job('index_similarity')
+def index_similarity_job(payload):
+    if load_numpy() is not None:
+        index_recipes(payload['recipe_ids'])
+
+@job('rebuild_similarity')
+def rebuild_similarity_job(payload):
+    if load_numpy() is not None:
+        rebuild_similarity_index()
+
+class SimilarityIndex:
+    """All signatures of one process in a NumPy matrix, kept in sync with
+    recipe_signatures by reading only the rows whose version is newer.
+
+    Queries compare one signature against every row at once: the share
+    of equal positions estimates the Jaccard similarity of the token sets.
+    """
+
+    def __init__(self, sync_interval=5):
+        load_numpy()
+        self.sync_interval = sync_interval
+        self.lock = threading.Lock()
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.signatures = np.zeros((0, NUM_HASHES), dtype=np.uint16)
+        self.valid = np.zeros(0, dtype=bool)
+        self.rows = {}
+        self.size = 0
+        self.version = 0
+        self.synced_at = 0
+
+    def sync(self, force=False):
+        """Apply changes made since the last sync, at most every sync_interval seconds"""
+        if not force and time.monotonic() - self.synced_at < self.sync_interval:
+            return
+        with self.lock:
+            if not force and time.monotonic() - self.synced_at < self.sync_interval:
+                return
+            changes = db.session.execute(
+                select(RecipeSignature.recipe_id, RecipeSignature.signature, RecipeSignature.version)
+                .where(RecipeSignature.version > self.version).order_by(RecipeSignature.version)
+            ).all()
+            if changes:
+                self._apply(changes)
+            self.synced_at = time.monotonic()
+
+    def _apply(self, changes):
+        size = self.size
+        new_ids = {recipe_id for recipe_id, _, _ in changes if recipe_id not in self.rows}
+        needed = size + len(new_ids)
+        if needed > len(self.ids):
+            # Grow geometrically; queries keep using the arrays they already hold
+            capacity = max(needed, 2 * len(self.ids), 1024)
+            ids = np.zeros(capacity, dtype=np.int64)
+            signatures = np.zeros((capacity, NUM_HASHES), dtype=np.uint16)
+            valid = np.zeros(capacity, dtype=bool)
+            ids[:size] = self.ids[:size]
+            signatures[:size] = self.signatures[:size]
+            valid[:size] = self.valid[:size]
+        else:
+            ids, signatures, valid = self.ids, self.signatures, self.valid
+        for recipe_id, signature, version in changes:
+            row = self.rows.get(recipe_id)
+            if row is None:
+                row = self.rows[recipe_id] = size
+                ids[row] = recipe_id
+                size += 1
+            if signature is None:
+                valid[row] = False
+            else:
+                signatures[row] = np.frombuffer(signature, dtype=np.uint16)
+                valid[row] = True
+            self.version = version
+        # Publish the arrays before the size so readers never index past them
+        self.ids, self.signatures, self.valid = ids, signatures, valid
+        self.size = size
+
+    def signature_of(self, recipe_id):
+        row = self.rows.get(recipe_id)
+        if row is None or not self.valid[row]:
+            return None
+        return self.signatures[row]
+
+    def similar(self, signature, k, exclude=None):
+        """Top `k` (recipe_id, similarity) pairs for a signature, best first"""
+        size = self.size
+        ids, valid = self.ids[:size], self.valid[:size]
+        scores = np.count_nonzero(self.signatures[:size] == signature, axis=1).astype(np.float32)
+        scores[~valid] = -1
+        row = self.rows.get(exclude)
+        if row is not None and row < size:
+            scores[row] = -1
+        k = min(k, size)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(ids[i]), float(scores[i]) / NUM_HASHES) for i in top if scores[i] > 0]
+
+def get_similarity_index():
+    """This process's index, loaded on first use and refreshed on later calls"""
+    index = current_app.extensions.get('similarity_index')
+    if index is None:
+        index = current_app.extensions.setdefault(
+            'similarity_index', SimilarityIndex(current_app.config['SIMILAR_SYNC_INTERVAL']))
+    index.sync()
+    return index
+
+def similar_recipes(recipe, k):
+    """(recipe_id, similarity) pairs for the `k` recipes most like `recipe`.
+
+    A recipe whose signature job has not run yet is hashed on the spot.
+    """
+    index = get_similarity_index()
+    signature = index.signature_of(recipe.id)
+    if signature is None:
+        tokens = recipe_tokens(recipe.title, recipe.ingredients)
+        if not tokens:
+            return []
+        signature = compute_signatures([tokens])[0]
+    return index.similar(signature, k, exclude=recipe.id)
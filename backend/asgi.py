@@ -0,0 +1,8 @@
+import os
+from a2wsgi import WSGIMiddleware
+from app import create_app
+
+# The same Flask app behind an ASGI adapter for uvicorn workers; each
+# request runs on one of WEB_THREADS threads while the event loop keeps
+# slow clients and idle keep-alive connections off them
+app = WSGIMiddleware(create_app(), workers=int(os.environ.get('WEB_THREADS', 4)))
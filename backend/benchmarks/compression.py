@@ -0,0 +1,58 @@
+"""Bytes on the wire and CPU per request for each response encoding.
+
+Run from backend/:  python -m benchmarks.compression [--recipes 200] [--requests 200]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app import create_app
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+def measure(client, url, encoding, requests):
+    headers = {'Accept-Encoding': encoding}
+    response = client.get(url, headers=headers)
+    start = time.process_time()
+    for _ in range(requests):
+        response = client.get(url, headers=headers)
+    cpu = (time.process_time() - start) / requests
+    return response.headers.get('Content-Encoding', 'identity'), len(response.data), cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    # A low threshold so the single-recipe body is compressed too
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+        'COMPRESS_MIN_SIZE': 256
+    })
+    client = app.test_client()
+    client.post('/signup', json={'username': 'bench', 'email': 'bench@example.com', 'password': 'benchpass'})
+    client.post('/login', json={'username': 'bench', 'password': 'benchpass'})
+    lines = [json.dumps({
+        'title': f'Recipe {i}',
+        'description': 'A hearty generated recipe with plenty of flavour. ' * 3,
+        'ingredients': '2 cups flour\n1 egg\n1 cup milk\n2 tbsp sugar\n',
+        'instructions': 'Whisk the dry ingredients, add the wet ones and bake for 30 minutes. ' * 5
+    }) for i in range(args.recipes)]
+    client.post('/recipes/bulk', data='\n'.join(lines))
+
+    urls = {
+        'listing (uncached)': '/recipes?limit=100&fields=id,title,description,ingredients,instructions,author',
+        'single recipe (cached)': '/recipes/1'
+    }
+    print(f"{'endpoint':<26}{'encoding':<10}{'bytes':>10}{'cpu/request':>14}")
+    for label, url in urls.items():
+        for encoding in ENCODINGS:
+            used, size, cpu = measure(client, url, encoding, args.requests)
+            print(f'{label:<26}{used:<10}{size:>10}{cpu * 1000:>11.3f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Concurrent create_recipe / get_recipes throughput per SQLite profile.
+
+Run from backend/:  python -m benchmarks.concurrency [--threads 8] [--seconds 5]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from app import create_app
+from app.database import SQLITE_PROFILES
+
+def run_profile(profile, threads, seconds):
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+        'SQLITE_PROFILE': profile
+    })
+
+    setup = app.test_client()
+    setup.post('/signup', json={'username': 'bench', 'email': 'bench@example.com', 'password': 'benchpass'})
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(writer):
+        client = app.test_client()
+        client.post('/login', json={'username': 'bench', 'password': 'benchpass'})
+        while time.perf_counter() < deadline:
+            if writer:
+                response = client.post('/recipes', json={
+                    'title': 'Bench recipe',
+                    'description': 'Generated by the concurrency benchmark',
+                    'ingredients': '2 cups flour\n1 egg\n1 cup milk',
+                    'instructions': 'Mix and bake.'
+                })
+                key = 'writes' if response.status_code == 201 else 'errors'
+            else:
+                response = client.get('/recipes?limit=20')
+                key = 'reads' if response.status_code == 200 else 'errors'
+            with lock:
+                counts[key] += 1
+
+    pool = [threading.Thread(target=worker, args=(i % 2 == 0,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    return {k: v / seconds for k, v in counts.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{'profile':<12}{'writes/s':>10}{'reads/s':>10}{'errors/s':>10}")
+    for profile in SQLITE_PROFILES:
+        result = run_profile(profile, args.threads, args.seconds)
+        print(f"{profile:<12}{result['writes']:>10.1f}{result['reads']:>10.1f}{result['errors']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
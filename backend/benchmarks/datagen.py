@@ -0,0 +1,129 @@
+"""Reproducible synthetic users and recipes, inserted in bulk.
+
+Run from backend/:
+    python -m benchmarks.datagen --database-url sqlite:////tmp/big.db --users 1000 --recipes 100000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.cli import CATEGORIES
+from app.ingredients import ingredient_index_rows
+
+PASSWORD = 'benchpass'
+
+INGREDIENTS = [
+    'flour', 'sugar', 'butter', 'egg', 'milk', 'salt', 'black pepper', 'olive oil',
+    'garlic', 'onion', 'tomato', 'basil', 'oregano', 'chicken breast', 'beef', 'rice',
+    'pasta', 'cheddar', 'parmesan', 'cream', 'lemon', 'lime', 'ginger', 'soy sauce',
+    'honey', 'carrot', 'potato', 'spinach', 'mushroom', 'bell pepper', 'chickpea',
+    'lentil', 'coconut milk', 'cumin', 'paprika', 'cinnamon', 'vanilla', 'yeast',
+    'baking powder', 'oat', 'yogurt', 'avocado', 'cilantro', 'parsley', 'shrimp', 'tofu'
+]
+UNITS = ['cup', 'cups', 'tbsp', 'tsp', 'g', 'ml', 'oz', 'lb', 'pinch', 'clove']
+WORDS = (
+    'quick easy hearty classic creamy spicy smoky fresh rustic golden crispy tender '
+    'roasted baked grilled simple homemade family weeknight summer winter bright '
+    'comforting zesty savory sweet warm light rich tangy herby'
+).split()
+DISHES = 'soup stew salad curry bake pie tart bowl pasta risotto stir-fry tacos cake bread'.split()
+VERBS = 'Whisk Stir Chop Slice Simmer Roast Bake Fold Season Toss Sear Blend Drain Serve'.split()
+
+def _zipf_weights(n, s=1.1):
+    return [1 / (i + 1) ** s for i in range(n)]
+
+def make_recipe(rng, user_id, category_ids, category_weights, created_at):
+    dish = rng.choice(DISHES)
+    title = ' '.join(rng.sample(WORDS, rng.randint(1, 3)) + rng.sample(INGREDIENTS, 1) + [dish]).title()
+    description = ' '.join(rng.choices(WORDS + INGREDIENTS, k=rng.randint(20, 60))).capitalize() + '.'
+    lines = []
+    for name in rng.sample(INGREDIENTS, rng.randint(4, 15)):
+        quantity = rng.choice(['1', '2', '3', '1/2', '1 1/2', '250', '100'])
+        lines.append(f'{quantity} {rng.choice(UNITS)} {name}')
+    ingredients = '\n'.join(lines)
+    steps = []
+    for _ in range(rng.randint(3, 10)):
+        words = ' '.join(rng.choices(WORDS + INGREDIENTS, k=rng.randint(8, 20)))
+        steps.append(f'{rng.choice(VERBS)} the {words}.')
+    instructions = '\n'.join(steps)
+    count = rng.choices([0, 1, 2, 3], weights=[1, 4, 3, 2])[0]
+    categories = set(rng.choices(category_ids, weights=category_weights, k=count))
+    return (title[:100], description, ingredients, instructions, created_at, created_at, user_id), categories
+
+def generate(database_url, users, recipes, seed=42, batch_size=5000):
+    """Fill `database_url` with `users` users and `recipes` recipes.
+
+    Users get recipes on a Zipf-like distribution (a few prolific authors)
+    and categories are skewed the same way. Every user's password is
+    PASSWORD. Returns elapsed seconds.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        conn = db.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany('INSERT OR IGNORE INTO categories (name, description) VALUES (?, ?)',
+                               [(c['name'], c['description']) for c in CATEGORIES])
+            category_ids = [row[0] for row in cursor.execute('SELECT id FROM categories ORDER BY id')]
+            rng.shuffle(category_ids)
+            category_weights = _zipf_weights(len(category_ids))
+
+            password_hash = generate_password_hash(PASSWORD)
+            first_user = (cursor.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0]) + 1
+            cursor.executemany(
+                'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+                [(f'user{first_user + i}', f'user{first_user + i}@example.com', password_hash)
+                 for i in range(users)])
+            conn.commit()
+            user_ids = list(range(first_user, first_user + users))
+            user_weights = _zipf_weights(users, s=0.8)
+
+            base_time = datetime(2024, 1, 1)
+            next_id = (cursor.execute('SELECT COALESCE(MAX(id), 0) FROM recipes').fetchone()[0]) + 1
+            for offset in range(0, recipes, batch_size):
+                count = min(batch_size, recipes - offset)
+                recipe_rows, category_rows, ingredient_rows = [], [], []
+                for i in range(count):
+                    recipe_id = next_id + offset + i
+                    # Same text format SQLAlchemy writes, so keyset comparisons line up
+                    created_at = (base_time + timedelta(minutes=offset + i)).strftime('%Y-%m-%d %H:%M:%S.%f')
+                    row, categories = make_recipe(
+                        rng, rng.choices(user_ids, weights=user_weights)[0],
+                        category_ids, category_weights, created_at)
+                    recipe_rows.append((recipe_id,) + row)
+                    category_rows += [(recipe_id, c) for c in categories]
+                    ingredient_rows += ingredient_index_rows(recipe_id, row[2])
+                cursor.executemany(
+                    'INSERT INTO recipes (id, title, description, ingredients, instructions, '
+                    'created_at, updated_at, user_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', recipe_rows)
+                cursor.executemany('INSERT INTO recipe_categories (recipe_id, category_id) VALUES (?, ?)',
+                                   category_rows)
+                cursor.executemany('INSERT INTO recipe_ingredients (recipe_id, ingredient_token, quantity, unit, '
+                                   'recipe_total) VALUES (:recipe_id, :ingredient_token, :quantity, :unit, '
+                                   ':recipe_total)', ingredient_rows)
+                conn.commit()
+            cursor.execute('ANALYZE')
+            conn.commit()
+        finally:
+            conn.close()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    elapsed = generate(args.database_url, args.users, args.recipes, args.seed)
+    print(f'Generated {args.users} users and {args.recipes} recipes in {elapsed:.1f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Serialize 10k recipes through each JSON path.
+
+Compares the original hand-written dicts with Flask's stdlib provider
+against the precompiled serializers with the stdlib and orjson encoders.
+
+Run from backend/:  python -m benchmarks.json_serialization [--count 10000]
+"""
+import argparse
+import time
+from datetime import datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app
+from app.json_provider import FastJSONProvider, orjson
+from app.models import Category, Recipe, User
+from app.serializers import serialize_recipe
+
+def make_recipes(count):
+    author = User(id=1, username='bench', email='bench@example.com')
+    categories = [Category(id=i, name=f'Category {i}') for i in range(1, 4)]
+    now = datetime.utcnow()
+    return [
+        Recipe(id=i, title=f'Recipe {i}', description='A generated recipe ' * 5,
+               ingredients='2 cups flour\n1 egg\n1 cup milk\n' * 3,
+               instructions='Mix everything, then bake for 30 minutes. ' * 10,
+               created_at=now, updated_at=now, user_id=1, author=author,
+               categories=categories)
+        for i in range(1, count + 1)
+    ]
+
+def handwritten(recipe):
+    return {
+        'id': recipe.id,
+        'title': recipe.title,
+        'description': recipe.description,
+        'ingredients': recipe.ingredients,
+        'instructions': recipe.instructions,
+        'created_at': recipe.created_at,
+        'updated_at': recipe.updated_at,
+        'user_id': recipe.user_id,
+        'author': recipe.author.username,
+        'categories': [{'id': c.id, 'name': c.name} for c in recipe.categories]
+    }
+
+def timed(label, build, encode, recipes, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode([build(r) for r in recipes])
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:<36}{best * 1000:>10.1f} ms{len(body) / 1024:>10.0f} KiB')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_ENGINE_OPTIONS': {}})
+    recipes = make_recipes(args.count)
+    flask_default = DefaultJSONProvider(app)
+
+    print(f"{'path':<36}{'best':>13}{'size':>14}")
+    timed('hand-written dicts + flask stdlib', handwritten, flask_default.dumps, recipes, args.repeat)
+    app.config['JSON_FAST_ENCODER'] = False
+    timed('compiled serializer + stdlib', serialize_recipe, FastJSONProvider(app).dump_bytes, recipes, args.repeat)
+    if orjson is not None:
+        app.config['JSON_FAST_ENCODER'] = True
+        timed('compiled serializer + orjson', serialize_recipe, FastJSONProvider(app).dump_bytes, recipes, args.repeat)
+    else:
+        print('orjson is not installed; skipping the fast path')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Pantry match latency by pantry size on a generated dataset.
+
+Run from backend/:  python -m benchmarks.pantry [--recipes 100000] [--queries 200]
+
+Pass --database-url to reuse a database generated earlier by
+benchmarks.datagen instead of generating a new one.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app import create_app, db
+from app.ingredients import match_pantry
+from benchmarks import datagen
+
+BUDGET_MS = 50
+SIZES = [1, 3, 6, 10]
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return [samples[min(int(len(samples) * p), len(samples) - 1)] * 1000 for p in (0.5, 0.9, 0.99)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200, help='pantries per size')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+        print(f'Generated {args.recipes} recipes in {datagen.generate(database_url, args.users, args.recipes):.1f}s')
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'JOB_WORKERS': 0,
+        'RATE_LIMIT_ENABLED': False
+    })
+    client = app.test_client()
+    rng = random.Random(1)
+
+    print(f"\n{'pantry size':<14}{'':<22}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    over_budget = False
+    for size in SIZES:
+        pantries = [rng.sample(datagen.INGREDIENTS, size) for _ in range(args.queries)]
+        ranking = []
+        with app.app_context():
+            for pantry in pantries:
+                start = time.perf_counter()
+                match_pantry(pantry, limit=args.limit)
+                ranking.append(time.perf_counter() - start)
+                db.session.remove()
+        endpoint = []
+        for pantry in pantries:
+            start = time.perf_counter()
+            response = client.get('/recipes/pantry', query_string={
+                'ingredients': ','.join(pantry), 'limit': args.limit})
+            endpoint.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        endpoint_ms = percentiles(endpoint)
+        over_budget |= endpoint_ms[0] > BUDGET_MS
+        print(f"{size:<14}{'match_pantry':<22}" + ''.join(f'{v:>10.2f}' for v in percentiles(ranking)))
+        print(f"{'':<14}{'GET /recipes/pantry':<22}" + ''.join(f'{v:>10.2f}' for v in endpoint_ms))
+
+    print(f"\nMedian endpoint latency is {'over' if over_budget else 'within'} the "
+          f"{BUDGET_MS} ms budget {'for some' if over_budget else 'at every'} pantry size")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Login throughput per core at several password hash costs.
+
+Run from backend/:  python -m benchmarks.password_hashing [--threads 8] [--seconds 5]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from app import create_app
+
+METHODS = ['pbkdf2:sha256:100000', 'pbkdf2:sha256:260000', 'pbkdf2:sha256:600000', 'scrypt']
+
+def run_method(method, workers, threads, seconds):
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_HASH_WORKERS': workers,
+        'RATE_LIMIT_ENABLED': False
+    })
+    app.test_client().post('/signup', json={'username': 'bench', 'email': 'bench@example.com', 'password': 'benchpass'})
+
+    counts = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            response = client.post('/login', json={'username': 'bench', 'password': 'benchpass'})
+            with lock:
+                counts['ok' if response.status_code == 200 else 'busy'] += 1
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return counts['ok'] / seconds, counts['busy'] / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    cores = max(args.workers, 1)
+    print(f"{'method':<24}{'logins/s':>10}{'per core':>10}{'503/s':>8}")
+    for method in METHODS:
+        ok, busy = run_method(method, args.workers, args.threads, args.seconds)
+        print(f"{method:<24}{ok:>10.1f}{ok / cores:>10.1f}{busy:>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Cost of a rate-limited rejection compared with a login that hashes.
+
+Run from backend/:  python -m benchmarks.rate_limit [--requests 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app import create_app
+from app.ratelimit import MemoryRateLimiter, RedisRateLimiter
+
+def time_per_call(func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n
+
+def limiter_backends():
+    backends = [('memory', MemoryRateLimiter())]
+    try:
+        import fakeredis
+    except ImportError:
+        return backends
+    # In-process stand-in: shows the client-side cost only, not the round trip
+    backends.append(('redis (fakeredis)', RedisRateLimiter(client=fakeredis.FakeRedis())))
+    return backends
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'limiter.hit, rejected':<32}{'us/call':>10}")
+    for name, limiter in limiter_backends():
+        limiter.hit('bench', 1, 3600)
+        cost = time_per_call(lambda: limiter.hit('bench', 1, 3600), args.requests * 10)
+        print(f"{name:<32}{cost * 1e6:>10.2f}")
+
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+        'PASSWORD_HASH_WORKERS': 0,
+        'RATE_LIMIT_ENABLED': False
+    })
+    client = app.test_client()
+    client.post('/signup', json={'username': 'bench', 'email': 'bench@example.com', 'password': 'benchpass'})
+    wrong = {'username': 'bench', 'password': 'wrong'}
+
+    hashing = time_per_call(lambda: client.post('/login', json=wrong), max(args.requests // 100, 5))
+
+    limits = app.extensions['rate_limits']
+    limits.enabled = True
+    limits.limits['login'] = [('ip', 1, 3600.0)]
+    client.post('/login', json=wrong)
+    statuses = set()
+    rejected = time_per_call(lambda: statuses.add(client.post('/login', json=wrong).status_code), args.requests)
+
+    print(f"\n{'POST /login (test client)':<32}{'us/req':>10}")
+    print(f"{'wrong password, hashed':<32}{hashing * 1e6:>10.1f}")
+    print(f"{'rejected with 429':<32}{rejected * 1e6:>10.1f}   statuses {sorted(statuses)}")
+    print(f"\nA rejection is {hashing / rejected:.0f}x cheaper than a hashed attempt")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Requests per second and latency percentiles for each serving mode.
+
+Starts the app under the development server, gunicorn (sync and gthread
+workers) and gunicorn with uvicorn workers, against the same seeded
+database, and drives each with keep-alive clients. Modes whose server is
+not installed are skipped.
+
+Run from backend/:  python -m benchmarks.server_modes [--clients 32] [--seconds 10]
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from app import create_app
+
+PORT = 5099
+
+MODES = {
+    'dev-server': (None, [sys.executable, '-m', 'flask', '--app', 'wsgi', 'run', '--port', str(PORT)], {}),
+    'gunicorn-sync': ('gunicorn', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                      {'WEB_WORKER_CLASS': 'sync'}),
+    'gunicorn-gthread': ('gunicorn', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                         {'WEB_WORKER_CLASS': 'gthread'}),
+    'gunicorn-uvicorn': ('uvicorn', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                         {'SERVER_MODE': 'asgi'}),
+}
+
+URLS = ['/recipes?limit=20', '/recipes/1', '/categories']
+
+def seed(database_url, recipes):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    client = app.test_client()
+    client.post('/signup', json={'username': 'bench', 'email': 'bench@example.com', 'password': 'benchpass'})
+    client.post('/login', json={'username': 'bench', 'password': 'benchpass'})
+    lines = [json.dumps({
+        'title': f'Recipe {i}',
+        'description': 'A generated recipe for the load test.',
+        'ingredients': '2 cups flour\n1 egg\n1 cup milk',
+        'instructions': 'Mix and bake for 30 minutes.'
+    }) for i in range(recipes)]
+    client.post('/recipes/bulk', data='\n'.join(lines))
+
+def wait_ready(timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            conn.request('GET', '/categories')
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def start_server(name, database_url, workers):
+    """Start a serving mode on PORT. Returns the process, or None if the
+    server it needs is not installed."""
+    module, command, extra_env = MODES[name]
+    if module and importlib.util.find_spec(module) is None:
+        return None
+    env = dict(os.environ, DATABASE_URL=database_url, BIND=f'127.0.0.1:{PORT}',
+               WEB_WORKERS=str(workers), WEB_ACCESS_LOG='', WEB_MAX_REQUESTS='0',
+               RATE_LIMIT_ENABLED='0', **extra_env)
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_ready():
+        server.terminate()
+        server.wait()
+        raise RuntimeError(f'{name} failed to start')
+    return server
+
+def drive(clients, seconds):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(index):
+        conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+        local = []
+        i = index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', URLS[i % len(URLS)])
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[0] += 1
+            except (OSError, http.client.HTTPException):
+                errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0.0
+    return len(latencies) / seconds, pct(0.50), pct(0.99), errors[0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    seed(database_url, args.recipes)
+
+    print(f"{'mode':<20}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name in MODES:
+        try:
+            server = start_server(name, database_url, args.workers)
+        except RuntimeError as e:
+            print(f'{name:<20}{e}')
+            continue
+        if server is None:
+            print(f'{name:<20}skipped (not installed)')
+            continue
+        try:
+            rps, p50, p99, errors = drive(args.clients, args.seconds)
+            print(f'{name:<20}{rps:>10.1f}{p50:>10.2f}{p99:>10.2f}{errors:>8}')
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
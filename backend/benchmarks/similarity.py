@@ -0,0 +1,69 @@
+"""Similar-recipes index build time and query latency on a generated dataset.
+
+Run from backend/:  python -m benchmarks.similarity [--recipes 100000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app import create_app, db
+from app.similar import SimilarityIndex, rebuild_similarity_index
+from benchmarks import datagen
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return [samples[min(int(len(samples) * p), len(samples) - 1)] * 1000 for p in (0.5, 0.9, 0.99)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    print(f'Generated {args.recipes} recipes in {datagen.generate(database_url, args.users, args.recipes):.1f}s')
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'JOB_WORKERS': 0,
+        'SIMILAR_SYNC_INTERVAL': 3600
+    })
+    rng = random.Random(1)
+    with app.app_context():
+        start = time.perf_counter()
+        rebuild_similarity_index()
+        print(f'Index build: {time.perf_counter() - start:.2f}s')
+
+        index = SimilarityIndex()
+        start = time.perf_counter()
+        index.sync(force=True)
+        print(f'Index load:  {time.perf_counter() - start:.2f}s '
+              f'({index.size} signatures, {index.signatures[:index.size].nbytes / 1e6:.1f} MB)')
+
+        ids = [rng.randint(1, args.recipes) for _ in range(args.queries)]
+        samples = []
+        for recipe_id in ids:
+            start = time.perf_counter()
+            index.similar(index.signature_of(recipe_id), args.k, exclude=recipe_id)
+            samples.append(time.perf_counter() - start)
+        app.extensions['similarity_index'] = index
+        db.session.remove()
+
+    client = app.test_client()
+    endpoint = []
+    for recipe_id in ids:
+        start = time.perf_counter()
+        response = client.get(f'/recipes/{recipe_id}/similar?k={args.k}')
+        endpoint.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    print(f"\n{'top-' + str(args.k):<28}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    print(f"{'index.similar':<28}" + ''.join(f'{v:>10.2f}' for v in percentiles(samples)))
+    print(f"{'GET /recipes/<id>/similar':<28}" + ''.join(f'{v:>10.2f}' for v in percentiles(endpoint)))
+
+if __name__ == '__main__':
+    main()
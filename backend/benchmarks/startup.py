@@ -0,0 +1,112 @@
+"""Cold start: import time, app creation and time to first request.
+
+Every run is a fresh interpreter, as a newly forked-and-exec'd worker or
+a CLI invocation would be. Compares a database that needs every
+migration, one already at the current schema and DB_AUTO_MIGRATE=0, and
+lists the slowest top-level imports.
+
+Run from backend/:  python -m benchmarks.startup [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Runs in the child interpreter and prints its timings as JSON
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+response = flask_app.test_client().get('/categories')
+first = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first - created) * 1000,
+    'modules': len(sys.modules),
+    'deferred': [name for name in ('numpy', 'PIL') if name not in sys.modules]
+}))
+'''
+
+def child_env(database_path, **overrides):
+    env = dict(os.environ,
+               DATABASE_URL='sqlite:///' + database_path,
+               JOB_WORKERS='0',
+               PASSWORD_HASH_WORKERS='0')
+    env.update(overrides)
+    return env
+
+def run_probe(env):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['wall_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+def run_command(args, env):
+    start = time.perf_counter()
+    subprocess.run(args, env=env, capture_output=True, check=True)
+    return {'wall_ms': (time.perf_counter() - start) * 1000}
+
+def slowest_imports(env, count):
+    """(cumulative ms, name) for the slowest packages and app modules loaded
+    by create_app(), each including whatever it was first to import"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+                         env=env, capture_output=True, text=True, check=True)
+    imports = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line.split('|'))
+        if name != 'app' and ('.' not in name or name.count('.') == 1 and name.startswith('app.')):
+            imports.append((int(cumulative) / 1000, name))
+    return sorted(imports, reverse=True)[:count]
+
+def summarize(name, runs, columns):
+    cells = ''.join(f'{statistics.median(r[c] for r in runs):>12.1f}' for c in columns)
+    print(f'{name:<28}{cells}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--imports', type=int, default=12, help='slowest imports to list')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    current = os.path.join(tmpdir, 'current.db')
+    # Bring one database to the current schema and warm the bytecode cache
+    run_probe(child_env(current))
+
+    scenarios = {
+        'empty database': [run_probe(child_env(os.path.join(tmpdir, f'fresh{i}.db')))
+                           for i in range(args.runs)],
+        'current schema': [run_probe(child_env(current)) for _ in range(args.runs)],
+        'DB_AUTO_MIGRATE=0': [run_probe(child_env(current, DB_AUTO_MIGRATE='0'))
+                              for _ in range(args.runs)]
+    }
+
+    columns = ['import_ms', 'create_app_ms', 'first_request_ms', 'wall_ms']
+    print(f"median of {args.runs} runs{'':<10}{'import':>12}{'create_app':>12}{'1st request':>12}{'wall':>12}")
+    for name, runs in scenarios.items():
+        summarize(name, runs, columns)
+    sample = scenarios['current schema'][-1]
+    print(f"\n{sample['modules']} modules loaded; deferred until first use: {', '.join(sample['deferred']) or 'none'}")
+
+    cli = [run_command([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'check'], child_env(current))
+           for _ in range(args.runs)]
+    print(f"\n{'flask db check':<28}{statistics.median(r['wall_ms'] for r in cli):>12.1f} ms wall")
+
+    print(f"\n{'slowest imports (cumulative)':<40}{'ms':>8}")
+    for ms, name in slowest_imports(child_env(current), args.imports):
+        print(f'{name:<40}{ms:>8.1f}')
+
+if __name__ == '__main__':
+    main()
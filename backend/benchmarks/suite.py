@@ -0,0 +1,190 @@
+"""End-to-end benchmark suite over a generated dataset.
+
+Runs listing, single fetch, search, create, update (PUT and PATCH),
+delete and login scenarios through the Flask test client and/or a real
+server, and appends throughput and latency percentiles to a JSON results
+file so runs can be compared over time.
+
+Run from backend/:
+    python -m benchmarks.suite --recipes 100000 --target client --target gunicorn-gthread
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+
+from app import create_app
+from benchmarks import datagen, server_modes
+
+SCENARIOS = ['list', 'fetch', 'search', 'create', 'update', 'patch', 'delete', 'login']
+
+class TestClientTarget:
+    """Requests through Flask's test client, in process"""
+
+    def __init__(self, database_url):
+        self.client = create_app({
+            'SQLALCHEMY_DATABASE_URI': database_url,
+            'RATE_LIMIT_ENABLED': False
+        }).test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+class HTTPTarget:
+    """Requests over a keep-alive HTTP connection, carrying session cookies"""
+
+    def __init__(self, port):
+        self.port = port
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.cookies = SimpleCookie()
+
+    def request(self, method, path, body=None):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v.value}' for k, v in self.cookies.items())
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self.conn.request(method, path, body=payload, headers=headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        for header in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(header)
+        try:
+            return response.status, json.loads(data)
+        except ValueError:
+            return response.status, None
+
+def percentile(sorted_values, p):
+    return sorted_values[min(int(len(sorted_values) * p), len(sorted_values) - 1)]
+
+def run_scenario(target, name, iterations, rng, state):
+    words = ['garlic', 'tomato', 'creamy soup', 'chicken', 'spicy', 'lemon cake', 'tofu']
+    latencies = []
+    errors = 0
+    for i in range(iterations):
+        if name == 'list':
+            request = ('GET', '/recipes?limit=20', None)
+        elif name == 'fetch':
+            request = ('GET', f'/recipes/{rng.randint(1, state["recipes"])}', None)
+        elif name == 'search':
+            request = ('GET', f'/recipes/search?q={rng.choice(words).replace(" ", "+")}', None)
+        elif name == 'create':
+            request = ('POST', '/recipes', {
+                'title': f'Benchmark recipe {i}',
+                'description': 'Created by the benchmark suite.',
+                'ingredients': '2 cups flour\n1 egg\n1 cup milk',
+                'instructions': 'Mix and bake for 30 minutes.'
+            })
+        elif name == 'update':
+            request = ('PUT', f'/recipes/{state["created"][i % len(state["created"])]}',
+                       {'title': f'Updated benchmark recipe {i}'})
+        elif name == 'patch':
+            request = ('PATCH', f'/recipes/{state["created"][i % len(state["created"])]}',
+                       {'title': f'Patched benchmark recipe {i}'})
+        elif name == 'delete':
+            if not state['created']:
+                break
+            request = ('DELETE', f'/recipes/{state["created"].pop()}', None)
+        else:
+            request = ('POST', '/login', {'username': state['username'], 'password': datagen.PASSWORD})
+
+        start = time.perf_counter()
+        status, body = target.request(*request)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors += 1
+        elif name == 'create':
+            state['created'].append(body['id'])
+
+    elapsed = sum(latencies)
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000 if latencies else None,
+        'p90_ms': percentile(latencies, 0.90) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None
+    }
+
+def run_target(target, iterations, recipes, seed):
+    rng = random.Random(seed)
+    state = {'recipes': recipes, 'created': [], 'username': 'user1'}
+    target.request('POST', '/login', {'username': state['username'], 'password': datagen.PASSWORD})
+    return {name: run_scenario(target, name, iterations, rng, state) for name in SCENARIOS}
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--target', action='append', choices=['client'] + list(server_modes.MODES),
+                        help='repeatable; defaults to the test client only')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', default='benchmarks/results.json')
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    generate_seconds = datagen.generate(database_url, args.users, args.recipes, args.seed)
+    print(f'Generated {args.recipes} recipes in {generate_seconds:.1f}s')
+
+    run = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'users': args.users,
+        'recipes': args.recipes,
+        'iterations': args.iterations,
+        'generate_seconds': generate_seconds,
+        'targets': {}
+    }
+    for name in args.target or ['client']:
+        if name == 'client':
+            results = run_target(TestClientTarget(database_url), args.iterations, args.recipes, args.seed)
+        else:
+            server = server_modes.start_server(name, database_url, args.workers)
+            if server is None:
+                print(f'{name}: skipped (not installed)')
+                continue
+            try:
+                results = run_target(HTTPTarget(server_modes.PORT), args.iterations, args.recipes, args.seed)
+            finally:
+                server.terminate()
+                server.wait()
+        run['targets'][name] = results
+        print(f'\n{name}')
+        print(f"{'scenario':<10}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for scenario, r in results.items():
+            if r['requests']:
+                print(f"{scenario:<10}{r['throughput']:>10.1f}{r['p50_ms']:>10.2f}"
+                      f"{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>8}")
+
+    history = []
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            history = json.load(f)
+    history.append(run)
+    with open(args.output, 'w') as f:
+        json.dump(history, f, indent=2)
+    print(f'\nResults appended to {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+# Production server settings, all overridable from the environment:
+#   gunicorn -c gunicorn.conf.py
+import multiprocessing
+import os
+
+# SERVER_MODE=wsgi serves wsgi:app with threaded workers; SERVER_MODE=asgi
+# serves asgi:app with uvicorn workers (requires uvicorn and a2wsgi)
+server_mode = os.environ.get('SERVER_MODE', 'wsgi')
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 100))
+
+if server_mode == 'asgi':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'wsgi:app'
+    worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+
+# Every worker builds its own app, engine pool and hashing pool after the
+# fork. Keep the hashing pools small since there is one per worker.
+preload_app = False
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '1')
+
+# Set WEB_ACCESS_LOG to an empty string to turn access logging off
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-') or None
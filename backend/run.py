@@ -1,6 +1,8 @@
+import os
 from app import create_app
 
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000) 
\ No newline at end of file
+    # Development server only; use gunicorn -c gunicorn.conf.py in production
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', port=5000, threaded=True) 
\ No newline at end of file
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.ingredients import index_ingredients
+from app.models import Category, Recipe, User
+
+@pytest.fixture
+def app_config():
+    """Config overrides for the app fixture; override it in a test module"""
+    return {}
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'DB_SNAPSHOT_PATH': str(tmp_path / 'snapshot.db'),
+        'USER_CACHE_STAMP': str(tmp_path / 'users.stamp'),
+        'IMAGE_ROOT': str(tmp_path / 'images'),
+        'JOB_WORKERS': 0,
+        'PASSWORD_HASH_WORKERS': 0,
+        'RATE_LIMIT_ENABLED': False,
+        **app_config
+    })
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    app.extensions['read_router'].engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def statements(app):
+    """(sql, parameters) of every statement run on the primary or read engine"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    with app.app_context():
+        engines = {db.engine, app.extensions['read_router'].engine}
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', record)
+
+@pytest.fixture
+def make_recipes(app):
+    """make(count, username=None) adds `count` recipes in two categories
+    each, by a new author apiece or all by `username`. Returns their ids."""
+    def make(count, username=None):
+        with app.app_context():
+            categories = Category.query.order_by(Category.id).all()
+            if not categories:
+                categories = [Category(name=f'Category {i}', description='') for i in range(4)]
+                db.session.add_all(categories)
+            start = db.session.query(db.func.count(Recipe.id)).scalar()
+            author = None
+            if username:
+                author = User(username=username, email=f'{username}@example.com')
+            recipes = []
+            for i in range(start, start + count):
+                recipe = Recipe(title=f'Tomato soup {i}', description='Warming soup',
+                                ingredients='2 tomatoes\n1 onion\nsalt', instructions='Simmer.',
+                                author=author or User(username=f'cook{i}', email=f'cook{i}@example.com'),
+                                categories=categories[i % 3:i % 3 + 2])
+                index_ingredients(recipe)
+                recipes.append(recipe)
+            db.session.add_all(recipes)
+            db.session.commit()
+            return [recipe.id for recipe in recipes]
+    return make
@@ -0,0 +1,49 @@
+import json
+from sqlalchemy import text
+from app import db
+from app.models import Category, Recipe
+
+def recipe_line(title, **extra):
+    return json.dumps({'title': title, 'description': 'x', 'ingredients': '1 egg',
+                       'instructions': 'x', **extra})
+
+def import_lines(client, lines):
+    client.post('/signup', json={'username': 'cook', 'email': 'cook@example.com', 'password': 'secret1'})
+    client.post('/login', json={'username': 'cook', 'password': 'secret1'})
+    response = client.post('/recipes/bulk', data='\n'.join(lines))
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+def test_invalid_lines_are_rejected_alone(app, client):
+    with app.app_context():
+        db.session.add(Category(name='Dinner', description=''))
+        db.session.commit()
+    body = import_lines(client, [
+        recipe_line('Soup', categories=['Dinner', {'name': 'Dinner'}, 1]),
+        json.dumps({'title': {'a': 1}, 'description': 'x', 'ingredients': 'x', 'instructions': 'x'}),
+        recipe_line('Stew', categories=[['Dinner']]),
+        recipe_line('Bread', categories=[99]),
+        'not json',
+        recipe_line('Salad')
+    ])
+    assert body['inserted'] == 2
+    assert body['errors'] == [
+        {'line': 2, 'error': 'Fields must be strings: title'},
+        {'line': 3, 'error': 'Categories must be ids, names or {"name": ...} objects'},
+        {'line': 4, 'error': 'Unknown category: 99'},
+        {'line': 5, 'error': 'Invalid JSON'}
+    ]
+    with app.app_context():
+        assert sorted(title for (title,) in db.session.query(Recipe.title)) == ['Salad', 'Soup']
+
+def test_insert_failure_drops_only_its_line(app, client):
+    with app.app_context():
+        db.session.execute(text('''
+            CREATE TRIGGER reject_boom BEFORE INSERT ON recipes WHEN new.title = 'boom'
+            BEGIN SELECT RAISE(ABORT, 'boom rejected'); END
+        '''))
+        db.session.commit()
+    body = import_lines(client, [recipe_line('Soup'), recipe_line('boom'), recipe_line('Salad')])
+    assert body == {'inserted': 2, 'errors': [{'line': 2, 'error': 'Could not insert recipe'}]}
+    with app.app_context():
+        assert sorted(title for (title,) in db.session.query(Recipe.title)) == ['Salad', 'Soup']
@@ -0,0 +1,24 @@
+import sqlite3
+from app import db
+from app.migrations import SCHEMA_VERSION, get_version, migrate
+
+def test_migrations_are_idempotent(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'test.db')
+    assert [version for version, _ in migrate(conn)] == list(range(1, SCHEMA_VERSION + 1))
+    # Re-running every migration over the current schema must not fail
+    conn.execute('PRAGMA user_version = 0')
+    assert len(migrate(conn)) == SCHEMA_VERSION
+    assert get_version(conn) == SCHEMA_VERSION
+
+def test_migrates_database_made_by_create_all(app, tmp_path):
+    path = tmp_path / 'create_all.db'
+    with app.app_context():
+        engine = db.create_engine('sqlite:///' + str(path))
+        db.metadata.create_all(engine)
+        engine.dispose()
+    conn = sqlite3.connect(path)
+    assert get_version(conn) == 0
+    migrate(conn)
+    assert get_version(conn) == SCHEMA_VERSION
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(recipes)')}
+    assert 'version' in columns
@@ -0,0 +1,46 @@
+import json
+import random
+from app.ingredients import match_pantry, parse_ingredients
+from app.jobs import run_pending
+from app.models import Recipe
+
+VOCABULARY = ['egg', 'flour', 'milk', 'butter', 'sugar', 'salt', 'onion', 'garlic']
+
+def brute_force(ingredients_by_id, pantry, limit):
+    """(recipe_id, matched, total) ranked straight from the ingredient text"""
+    ranked = []
+    for recipe_id, ingredients in ingredients_by_id.items():
+        tokens = {token for token, _, _ in parse_ingredients(ingredients)}
+        matched = len(tokens & set(pantry))
+        if matched:
+            ranked.append((matched / len(tokens), matched, recipe_id, len(tokens)))
+    ranked.sort(reverse=True)
+    return [(recipe_id, matched, total) for _, matched, recipe_id, total in ranked[:limit]]
+
+def test_match_pantry_ranks_like_brute_force(app, client):
+    rng = random.Random(7)
+
+    def ingredients():
+        return '\n'.join(rng.sample(VOCABULARY, rng.randint(1, 6)))
+
+    client.post('/signup', json={'username': 'cook', 'email': 'cook@example.com', 'password': 'secret1'})
+    client.post('/login', json={'username': 'cook', 'password': 'secret1'})
+    # Index rows written by the create and update jobs and by bulk import
+    for i in range(100):
+        response = client.post('/recipes', json={'title': f'Recipe {i}', 'description': 'x',
+                                                 'ingredients': ingredients(), 'instructions': 'x'})
+        assert response.status_code == 201, response.get_data(as_text=True)
+    for recipe_id in range(1, 101, 3):
+        response = client.patch(f'/recipes/{recipe_id}', json={'ingredients': ingredients()})
+        assert response.status_code == 200, response.get_data(as_text=True)
+    lines = [json.dumps({'title': f'Bulk {i}', 'description': 'x', 'ingredients': ingredients(),
+                         'instructions': 'x'}) for i in range(200)]
+    assert client.post('/recipes/bulk', data='\n'.join(lines)).get_json()['inserted'] == 200
+
+    with app.app_context():
+        run_pending()
+        ingredients_by_id = dict(Recipe.query.with_entities(Recipe.id, Recipe.ingredients))
+        for _ in range(50):
+            pantry = rng.sample(VOCABULARY, rng.randint(1, 6))
+            limit = rng.choice([1, 5, 20])
+            assert [tuple(m) for m in match_pantry(pantry, limit)] == brute_force(ingredients_by_id, pantry, limit)
@@ -0,0 +1,33 @@
+import pytest
+from app import db
+from app.models import User
+
+N = 5
+
+def count_statements(client, statements, url):
+    """(recipes returned, statements run) for a GET of `url`"""
+    client.get(url)  # warm up connections and caches first
+    del statements[:]
+    response = client.get(url)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(response.get_json()['recipes']), len(statements)
+
+@pytest.mark.parametrize('url', [
+    '/recipes?limit={limit}',
+    '/recipes?limit={limit}&fields=id,title,author,categories',
+    '/recipes?limit={limit}&categories=1,2',
+    '/recipes/latest?limit={limit}',
+    '/users/{user_id}/recipes?limit={limit}',
+    '/recipes/search?q=tomato&limit={limit}',
+    '/recipes/pantry?ingredients=tomato,onion&limit={limit}'
+])
+def test_statement_count_does_not_grow_with_results(app, client, statements, make_recipes, url):
+    make_recipes(10 * N)
+    make_recipes(10 * N, username='prolific')
+    with app.app_context():
+        user_id = db.session.query(User.id).filter_by(username='prolific').scalar()
+
+    small = count_statements(client, statements, url.format(limit=N, user_id=user_id))
+    large = count_statements(client, statements, url.format(limit=10 * N, user_id=user_id))
+    assert (small[0], large[0]) == (N, 10 * N)
+    assert large[1] == small[1]
@@ -0,0 +1,60 @@
+import pytest
+from app import db
+from app.models import User
+
+def query_plan(app, statement, parameters):
+    """EXPLAIN QUERY PLAN details for a statement the app ran"""
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            return [row[3] for row in connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters)]
+        finally:
+            connection.close()
+
+def page_plan(app, client, statements, url):
+    """Query plan of the recipe page SELECT behind a GET of `url`, and the
+    next page's cursor"""
+    del statements[:]
+    response = client.get(url)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    pages = [(sql, parameters) for sql, parameters in statements
+             if 'FROM recipes' in sql and 'ORDER BY recipes.created_at DESC' in sql]
+    assert len(pages) == 1, statements
+    return query_plan(app, *pages[0]), response.get_json()['next_cursor']
+
+def assert_uses_index(plan, index, seek=False):
+    # A seek is a SEARCH that starts at the cursor; a SCAN walks down to it
+    steps = ('SEARCH',) if seek else ('SEARCH', 'SCAN')
+    assert any(step.startswith(steps) and f'INDEX {index} ' in step + ' ' for step in plan), plan
+    # Pages come off the index in order; a sort would read every match first
+    assert not any('TEMP B-TREE FOR ORDER BY' in step for step in plan), plan
+
+@pytest.fixture
+def user_id(app, make_recipes):
+    make_recipes(30)
+    make_recipes(30, username='prolific')
+    with app.app_context():
+        return db.session.query(User.id).filter_by(username='prolific').scalar()
+
+@pytest.mark.parametrize('url', [
+    '/recipes?user_id={user_id}&limit=10',
+    '/users/{user_id}/recipes?limit=10'
+])
+def test_user_filter_uses_user_index(app, client, statements, user_id, url):
+    url = url.format(user_id=user_id)
+    plan, cursor = page_plan(app, client, statements, url)
+    assert_uses_index(plan, 'ix_recipes_user_id')
+    plan, _ = page_plan(app, client, statements, f'{url}&cursor={cursor}')
+    assert_uses_index(plan, 'ix_recipes_user_id', seek=True)
+
+@pytest.mark.parametrize('url', ['/recipes?limit=10', '/recipes/latest?limit=10'])
+def test_created_at_keyset_uses_created_at_index(app, client, statements, user_id, url):
+    plan, cursor = page_plan(app, client, statements, url)
+    assert_uses_index(plan, 'ix_recipes_created_at')
+    plan, _ = page_plan(app, client, statements, f'{url}&cursor={cursor}')
+    assert_uses_index(plan, 'ix_recipes_created_at', seek=True)
+
+@pytest.mark.parametrize('match', ['any', 'all'])
+def test_category_filter_uses_category_index(app, client, statements, user_id, match):
+    plan, _ = page_plan(app, client, statements, f'/recipes?categories=1,2&match={match}&limit=10')
+    assert any('INDEX ix_recipe_categories_category_id' in step for step in plan), plan
@@ -0,0 +1,55 @@
+import pytest
+from app import passwords
+
+@pytest.fixture
+def app_config():
+    return {
+        'RATE_LIMIT_ENABLED': True,
+        'RATE_LIMITS': {'login': 'ip=100/minute,username=3/minute', 'signup': 'ip=2/hour'}
+    }
+
+@pytest.fixture
+def hash_calls(monkeypatch):
+    """Names of the werkzeug hashing functions called, in order"""
+    calls = []
+    for name in ('check_password_hash', 'generate_password_hash'):
+        original = getattr(passwords, name)
+
+        def counted(*args, _name=name, _original=original):
+            calls.append(_name)
+            return _original(*args)
+        monkeypatch.setattr(passwords, name, counted)
+    return calls
+
+def assert_rejected_for_free(response, statements, hash_calls):
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert statements == []
+    assert hash_calls == []
+
+def test_login_over_limit_costs_no_query_or_hash(client, statements, hash_calls):
+    client.post('/signup', json={'username': 'alice', 'email': 'alice@example.com', 'password': 'secret1'})
+    for _ in range(3):
+        response = client.post('/login', json={'username': 'alice', 'password': 'wrong-password'})
+        assert response.status_code == 401
+    assert hash_calls.count('check_password_hash') == 3
+
+    del statements[:], hash_calls[:]
+    # Username keys are case-insensitive, so this is the fourth attempt too
+    response = client.post('/login', json={'username': 'Alice', 'password': 'secret1'})
+    assert_rejected_for_free(response, statements, hash_calls)
+
+    # Other usernames are still let through
+    response = client.post('/login', json={'username': 'bob', 'password': 'secret1'})
+    assert response.status_code == 401
+
+def test_signup_over_limit_costs_no_query_or_hash(client, statements, hash_calls):
+    for i in range(2):
+        response = client.post('/signup', json={'username': f'user{i}', 'email': f'user{i}@example.com',
+                                                'password': 'secret1'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    del statements[:], hash_calls[:]
+    response = client.post('/signup', json={'username': 'user2', 'email': 'user2@example.com',
+                                            'password': 'secret1'})
+    assert_rejected_for_free(response, statements, hash_calls)
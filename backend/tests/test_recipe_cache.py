@@ -0,0 +1,43 @@
+import fakeredis
+import pytest
+from sqlalchemy import text
+from app import db
+from app.cache import RedisCache, recipe_key
+from app.recipes import warm_recipe
+
+@pytest.fixture
+def cache(app):
+    cache = RedisCache(client=fakeredis.FakeRedis())
+    app.extensions['recipe_cache'] = cache
+    return cache
+
+def write_during_fill(app, cache, recipe_id):
+    """Make the next fill race with a write that commits and invalidates
+    between the read of the recipe and the cache set"""
+    set_entry = cache.set
+
+    def racing_set(key, value):
+        cache.set = set_entry
+        with app.app_context(), db.engine.begin() as conn:
+            conn.execute(text('UPDATE recipes SET version = version + 1 WHERE id = :id'), {'id': recipe_id})
+        cache.delete(key)
+        set_entry(key, value)
+    cache.set = racing_set
+
+def test_read_through_fill_keeps_current_entry(client, cache, make_recipes):
+    recipe_id, = make_recipes(1)
+    assert client.get(f'/recipes/{recipe_id}').status_code == 200
+    assert cache.get(recipe_key(recipe_id)) is not None
+
+def test_read_through_fill_drops_entry_overtaken_by_write(app, client, cache, make_recipes):
+    recipe_id, = make_recipes(1)
+    write_during_fill(app, cache, recipe_id)
+    assert client.get(f'/recipes/{recipe_id}').status_code == 200
+    assert cache.get(recipe_key(recipe_id)) is None
+
+def test_warm_job_drops_entry_overtaken_by_write(app, cache, make_recipes):
+    recipe_id, = make_recipes(1)
+    write_during_fill(app, cache, recipe_id)
+    with app.app_context():
+        warm_recipe({'recipe_id': recipe_id})
+    assert cache.get(recipe_key(recipe_id)) is None
@@ -0,0 +1,17 @@
+def test_snippets_escape_recipe_text(client):
+    client.post('/signup', json={'username': 'cook', 'email': 'cook@example.com', 'password': 'secret1'})
+    client.post('/login', json={'username': 'cook', 'password': 'secret1'})
+    response = client.post('/recipes', json={
+        'title': 'Toast <script>alert(1)</script>', 'description': 'x',
+        'ingredients': 'bread', 'instructions': 'x'})
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+    hits = client.get('/recipes/search', query_string={'q': 'toast'}).get_json()['recipes']
+    assert [hit['snippet'] for hit in hits] == [
+        '<mark>Toast</mark> &lt;script&gt;alert(1)&lt;/script&gt;']
+
+def test_malformed_filter_ids_are_rejected(client):
+    for name in ('category', 'user_id'):
+        response = client.get('/recipes/search', query_string={'q': 'toast', name: 'abc'})
+        assert response.status_code == 400
+        assert response.get_json() == {'error': f'{name} must be an integer'}
@@ -0,0 +1,49 @@
+import io
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from PIL import Image
+from app import images, passwords
+
+@pytest.fixture
+def app_config():
+    return {'PASSWORD_HASH_WORKERS': 1, 'IMAGE_WORKERS': 1, 'IMAGE_THUMBNAIL_SIZES': [32]}
+
+@pytest.fixture(autouse=True)
+def fresh_pools():
+    yield
+    for module in (passwords, images):
+        if module._pool is not None:
+            module._pool.shutdown()
+        module._pool = None
+
+def break_pool(pool):
+    """Kill a worker the way the OOM killer would"""
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result()
+
+def test_hashing_recovers_from_dead_worker(app):
+    with app.app_context():
+        broken, _ = passwords._get_pool(1, app.config['PASSWORD_HASH_QUEUE'])
+        break_pool(broken)
+        assert passwords.verify_password(passwords.hash_password('secret1'), 'secret1')
+        assert passwords._pool is not broken
+
+def test_thumbnails_recover_from_dead_worker(app):
+    png = io.BytesIO()
+    Image.new('RGB', (64, 64), 'red').save(png, 'PNG')
+    png.seek(0)
+    root = app.config['IMAGE_ROOT']
+    digest, _, _ = images.store_stream(png, root, 1 << 20)
+
+    with app.app_context():
+        broken = images._get_pool(1)
+        break_pool(broken)
+        images.schedule_thumbnails(digest)
+    assert images._pool is not broken
+    path = images.thumbnail_path(root, digest, 32)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert os.path.exists(path)
@@ -11,10 +11,14 @@ interface User {
   id: number;
   username: string;
   email: string;
+  recipe_count: number;
 }
 
 const Profile: React.FC = () => {
   const [userRecipes, setUserRecipes] = useState<Recipe[]>([]);
+  // Cursor for the next page of recipes, null once the last page is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [userInfo, setUserInfo] = useState<User | null>(null);
   const [isCurrentUser, setIsCurrentUser] = useState(true);
   const navigate = useNavigate();
@@ -53,7 +57,8 @@ const Profile: React.FC = () => {
         setUserInfo({
           id: data.id,
           username: data.username,
-          email: isCurrentUser ? data.email : undefined // Only show email for current user
+          email: isCurrentUser ? data.email : undefined, // Only show email for current user
+          recipe_count: data.recipe_count
         });
       } else if (response.status === 401) {
         alert('Your session has expired. Please log in again.');
@@ -65,9 +70,11 @@ const Profile: React.FC = () => {
     }
   };
 
-  const fetchUserRecipes = async (userId: string | number, token: string) => {
+  // Without a cursor this loads the first page; with one it appends the next
+  const fetchUserRecipes = async (userId: string | number, token: string, cursor: string | null = null) => {
     try {
-      const response = await fetch(`http://localhost:5000/recipes?user_id=${userId}`, {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`http://localhost:5000/users/${userId}/recipes${query}`, {
         headers: {
           'Authorization': `Bearer ${token}`
         },
@@ -76,7 +83,8 @@ const Profile: React.FC = () => {
 
       if (response.ok) {
         const data = await response.json();
-        setUserRecipes(data);
+        setUserRecipes(prev => cursor ? [...prev, ...data.recipes] : data.recipes);
+        setNextCursor(data.next_cursor);
       } else if (response.status === 401) {
         alert('Your session has expired. Please log in again.');
         localStorage.removeItem('user');
@@ -87,6 +95,13 @@ const Profile: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    const currentUser = JSON.parse(localStorage.getItem('user') || '{}');
+    setLoadingMore(true);
+    await fetchUserRecipes(userId || currentUser.id, currentUser.token, nextCursor);
+    setLoadingMore(false);
+  };
+
   if (!userInfo) {
     return <div className="loading">Loading...</div>;
   }
@@ -99,6 +114,7 @@ const Profile: React.FC = () => {
         {isCurrentUser && userInfo.email && (
           <p><strong>Email:</strong> {userInfo.email}</p>
         )}
+        <p><strong>Recipes:</strong> {userInfo.recipe_count}</p>
       </div>
 
       <div className="my-recipes">
@@ -120,6 +136,11 @@ const Profile: React.FC = () => {
             ))}
           </ul>
         )}
+        {nextCursor && (
+          <button onClick={loadMore} disabled={loadingMore} className="load-more-btn">
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        )}
       </div>
     </div>
   );
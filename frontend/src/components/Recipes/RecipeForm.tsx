@@ -17,6 +17,23 @@ interface RecipeFormData {
   author?: string;
 }
 
+const EDITABLE_FIELDS = ['title', 'description', 'ingredients', 'instructions'] as const;
+
+const changedFields = (original: RecipeFormData, current: RecipeFormData): Partial<RecipeFormData> => {
+  const changes: Partial<RecipeFormData> = {};
+  for (const field of EDITABLE_FIELDS) {
+    if (current[field] !== original[field]) {
+      changes[field] = current[field];
+    }
+  }
+  const sameCategories = current.category_ids.length === original.category_ids.length
+    && current.category_ids.every(id => original.category_ids.includes(id));
+  if (!sameCategories) {
+    changes.category_ids = current.category_ids;
+  }
+  return changes;
+};
+
 const RecipeForm: React.FC = () => {
   const [formData, setFormData] = useState<RecipeFormData>({
     title: '',
@@ -27,6 +44,10 @@ const RecipeForm: React.FC = () => {
   });
 
   const [categories, setCategories] = useState<Category[]>([]);
+  // The recipe as loaded and its ETag, so an edit sends only what changed
+  // and fails with 412 if someone else saved in between
+  const [original, setOriginal] = useState<RecipeFormData | null>(null);
+  const [etag, setEtag] = useState<string | null>(null);
   const [isOwner, setIsOwner] = useState<boolean>(true);
   const [isLoading, setIsLoading] = useState<boolean>(false);
   const navigate = useNavigate();
@@ -78,7 +99,7 @@ const RecipeForm: React.FC = () => {
       if (response.ok) {
         const data = await response.json();
         console.log('Fetched recipe data:', data);
-        setFormData({
+        const loaded = {
           title: data.title || '',
           description: data.description || '',
           ingredients: data.ingredients || '',
@@ -86,7 +107,10 @@ const RecipeForm: React.FC = () => {
           category_ids: data.categories ? data.categories.map((c: Category) => c.id) : [],
           user_id: data.user_id,
           author: data.author
-        });
+        };
+        setFormData(loaded);
+        setOriginal(loaded);
+        setEtag(response.headers.get('ETag'));
         setIsOwner(user?.id === data.user_id);
       } else if (response.status === 404) {
         console.error('Recipe not found');
@@ -118,20 +142,34 @@ const RecipeForm: React.FC = () => {
         ? `http://localhost:5000/recipes/${id}`
         : 'http://localhost:5000/recipes';
       
-      const method = isEditing ? 'PUT' : 'POST';
-      
+      const method = isEditing ? 'PATCH' : 'POST';
+      const headers: Record<string, string> = {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${user.token}`
+      };
+      let body: Partial<RecipeFormData> = formData;
+      if (isEditing && original) {
+        body = changedFields(original, formData);
+        if (Object.keys(body).length === 0) {
+          navigate('/recipes');
+          return;
+        }
+        if (etag) {
+          headers['If-Match'] = etag;
+        }
+      }
+
       const response = await fetch(url, {
         method,
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${user.token}`
-        },
+        headers,
         credentials: 'include',
-        body: JSON.stringify(formData)
+        body: JSON.stringify(body)
       });
 
       if (response.ok) {
         navigate('/recipes');
+      } else if (response.status === 412) {
+        alert('This recipe was changed by someone else. Reload it to see their changes before saving yours.');
       } else if (response.status === 401) {
         alert('Your session has expired. Please log in again.');
         localStorage.removeItem('user');
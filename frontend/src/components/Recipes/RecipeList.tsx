@@ -17,6 +17,9 @@ interface Recipe {
 
 const RecipeList: React.FC = () => {
   const [recipes, setRecipes] = useState<Recipe[]>([]);
+  // Cursor for the next page, null once the last page is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [currentUserId, setCurrentUserId] = useState<number | null>(null);
   const navigate = useNavigate();
 
@@ -29,12 +32,16 @@ const RecipeList: React.FC = () => {
     }
   }, []);
 
-  const fetchRecipes = async () => {
+  // Without a cursor this loads the first page; with one it appends the next
+  const fetchRecipes = async (cursor: string | null = null) => {
     try {
       const userStr = localStorage.getItem('user');
       const user = userStr ? JSON.parse(userStr) : null;
 
-      const response = await fetch('http://localhost:5000/recipes', {
+      const url = cursor
+        ? `http://localhost:5000/recipes?cursor=${encodeURIComponent(cursor)}`
+        : 'http://localhost:5000/recipes';
+      const response = await fetch(url, {
         headers: {
           'Authorization': `Bearer ${user?.token}`
         },
@@ -43,7 +50,8 @@ const RecipeList: React.FC = () => {
 
       if (response.ok) {
         const data = await response.json();
-        setRecipes(data);
+        setRecipes(prev => cursor ? [...prev, ...data.recipes] : data.recipes);
+        setNextCursor(data.next_cursor);
       } else if (response.status === 401) {
         alert('Your session has expired. Please log in again.');
         localStorage.removeItem('user');
@@ -54,6 +62,12 @@ const RecipeList: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    await fetchRecipes(nextCursor);
+    setLoadingMore(false);
+  };
+
   useEffect(() => {
     fetchRecipes();
   }, []);
@@ -76,7 +90,8 @@ const RecipeList: React.FC = () => {
       });
 
       if (response.ok) {
-        fetchRecipes(); // Refresh the list after deletion
+        // Drop it locally, so the pages loaded so far stay in place
+        setRecipes(prev => prev.filter(recipe => recipe.id !== recipeId));
       } else if (response.status === 401) {
         alert('Your session has expired. Please log in again.');
         localStorage.removeItem('user');
@@ -130,6 +145,11 @@ const RecipeList: React.FC = () => {
           </div>
         ))}
       </div>
+      {nextCursor && (
+        <button onClick={loadMore} disabled={loadingMore} className="load-more-btn">
+          {loadingMore ? 'Loading...' : 'Load more'}
+        </button>
+      )}
     </div>
   );
 };